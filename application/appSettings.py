@@ -22,6 +22,7 @@ class Property:
     TYPE_INT_RANGE = 2
     TYPE_FLOAT_RANGE = 3
     TYPE_MULTIPLE_OPTIONS = 4
+    TYPE_TEXT = 5
 
     def __init__(self, id, property_name = None, property_group = "default", type = 0, default=None, value=None) -> None:
         self.id = id
@@ -133,6 +134,18 @@ class IntRangeProperty(Property):
         prop.set(dict["value"])
         return prop
 
+class TextProperty(Property):
+    def __init__(self, id, name = None, default = "", value = None, group = "default") -> None:
+        super().__init__(id, property_name=name, property_group=group, type=Property.TYPE_TEXT, default=default, value = value)
+
+    def set(self, value):
+        self.value = str(value)
+
+    def from_dictionary(dict):
+        prop = TextProperty(dict["id"], dict["property_name"], dict["default"], group=dict["property_group"])
+        prop.set(dict["value"])
+        return prop
+
 class MultipleOptionsProperty(Property):
     def __init__(self, id, name = None, options=[], default = None, group = "default") -> None:
         super().__init__(id, name, group, Property.TYPE_MULTIPLE_OPTIONS, default, value=default)
@@ -251,12 +264,34 @@ class Settings:
                                                                                 "Depth First Tree Search",
                                                                                 "Depth First Graph Search",
                                                                                 "Iterative Depth First Search",
-                                                                                "A* Search"], 
+                                                                                "A* Search",
+                                                                                "IDA* Search",
+                                                                                "Bidirectional Breadth First Search",
+                                                                                "Anytime Weighted A* Search",
+                                                                                "Memory Bounded A* Search",
+                                                                                "Hash Distributed A* Search",
+                                                                                "Parallel Breadth First Search",
+                                                                                "Domain Specific Planner",
+                                                                                "External Memory Breadth First Search"], 
                                                 default="Breadth First Tree Search", 
                                                 group="model_properties"),
             MultipleOptionsProperty("goal_type", "Goal", options=["Default", "Custom"], 
                                     default="Default", 
-                                    group="model_properties")
+                                    group="model_properties"),
+            MultipleOptionsProperty("heuristic", "Euristica", options=["Fast", "Admissible", "Pattern Database", "Blind"],
+                                    default="Fast",
+                                    group="model_properties"),
+            BoolProperty("bitstate_hashing", "Rilevamento Duplicati Approssimato", default=False, group="model_properties"),
+            IntRangeProperty("bitstate_mb", "Memoria Rilevamento Duplicati (MB)", min=1, max=1024, default=16, group="model_properties"),
+            BoolProperty("checkpoint", "Salva Checkpoint Ricerca", default=False, group="model_properties"),
+            IntRangeProperty("checkpoint_interval", "Intervallo Checkpoint (s)", min=10, max=3600, default=300, group="model_properties"),
+            BoolProperty("plan_cache", "Usa Cache dei Piani", default=False, group="model_properties"),
+            IntRangeProperty("plan_cache_size", "Dimensione Cache dei Piani", min=10, max=10000, default=1000, group="model_properties"),
+            BoolProperty("optimize_plan", "Ottimizza Piano", default=False, group="model_properties"),
+            IntRangeProperty("optimize_window", "Finestra Ottimizzazione Piano", min=2, max=16, default=8, group="model_properties"),
+            TextProperty("external_scratch_dir", "Cartella Ricerca Esterna", default="", group="model_properties"),
+            IntRangeProperty("external_memory_mb", "Memoria Ricerca Esterna (MB)", min=1, max=4096, default=64, group="model_properties"),
+            IntRangeProperty("memory_bound_mb", "Memoria A* Limitato (MB)", min=1, max=4096, default=256, group="model_properties")
     ]
 
     def addColor(color):
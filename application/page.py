@@ -1,6 +1,8 @@
 from application.modelTunePanel import ModelTunePanel
 from utils.modelPainter import ModelPainter
 from modelling.problem import ColorBasedBlockWorldProblem, BlockWorldProblem
+from modelling.checkpoint import SearchCheckpoint, checkpoint_filename
+from modelling.planCache import PlanCache
 from application.appSettings import Settings
 from tkinter import Frame, Button, Label, Toplevel
 from tkinter.constants import BOTH, TOP, RIGHT, LEFT, BOTTOM, X
@@ -247,6 +249,7 @@ class ModelPage(Page):
             self.main = main
             self.solver = solver
             self.solver.setCallback(self.on_solved)
+            self.solver.setTelemetryCallback(self.on_telemetry)
             self.modelPainter = ModelPainter(background=(30,30,30), foreground=(30,30,30), 
                                              font_scale=0.5, text_thickness=1)
             self.model = []
@@ -441,9 +444,31 @@ class ModelPage(Page):
         def startSolving(self):
             if not self.solving:
                 goalType = Settings.getPropertyByID("goal_type").value
+                heuristic = Settings.getPropertyByID("heuristic").value
+                if Settings.getPropertyByID("optimize_plan").value:
+                    self.solver.setPlanOptimization(Settings.getPropertyByID("optimize_window").value)
+                else:
+                    self.solver.setPlanOptimization(None)
+                if Settings.getPropertyByID("plan_cache").value:
+                    self.solver.setPlanCache(PlanCache(max_entries = Settings.getPropertyByID("plan_cache_size").value))
+                else:
+                    self.solver.setPlanCache(None)
+                # cartella vuota: file temporanei nella cartella di sistema
+                self.solver.setExternalMemory(Settings.getPropertyByID("external_scratch_dir").value.strip() or None,
+                                              Settings.getPropertyByID("external_memory_mb").value * 2**20)
+                self.solver.setMemoryBound(Settings.getPropertyByID("memory_bound_mb").value * 2**20)
+                if Settings.getPropertyByID("bitstate_hashing").value:
+                    self.solver.setBitstate(Settings.getPropertyByID("bitstate_mb").value * 2**20)
+                else:
+                    self.solver.setBitstate(None)
                 if goalType == "Default":
-                    self.solver.setProblem(ColorBasedBlockWorldProblem(self.model))
+                    # non tutte le euristiche sono disponibili per il problema basato sui colori
+                    if heuristic not in ColorBasedBlockWorldProblem.HEURISTICS:
+                        heuristic = "Admissible"
+                    problem = ColorBasedBlockWorldProblem(self.model, heuristic = heuristic)
+                    self.solver.setProblem(problem)
                     self.solver.useAlgorithm(Settings.getPropertyByID("algorithm").value)
+                    self.useCheckpoint(problem)
                     self.resetSolution()
                     self.solver.solve()
                     self.solving = True
@@ -451,8 +476,15 @@ class ModelPage(Page):
                 elif goalType == "Custom":
                     success, goal = ModelTunePanel(self, self.model).show()
                     if success:
-                        self.solver.setProblem(BlockWorldProblem(self.model, goal))
+                        try:
+                            problem = BlockWorldProblem(self.model, goal, heuristic = heuristic)
+                        except ValueError as e:
+                            self.main.showMessage(str(e))
+                            self.modelControlPanel.setActive("stop")
+                            return
+                        self.solver.setProblem(problem)
                         self.solver.useAlgorithm(Settings.getPropertyByID("algorithm").value)
+                        self.useCheckpoint(problem)
                         self.resetSolution()
                         self.solver.solve()
                         self.solving = True
@@ -460,16 +492,64 @@ class ModelPage(Page):
                     else:
                         self.modelControlPanel.setActive("stop")
 
+        def useCheckpoint(self, problem):
+            # il file di checkpoint dipende dal problema e dall'algoritmo: se esiste
+            # già (ricerca interrotta in precedenza) la ricerca riprende da quel punto
+            if Settings.getPropertyByID("checkpoint").value:
+                algorithm = Settings.getPropertyByID("algorithm").value
+                self.solver.setCheckpoint(SearchCheckpoint(checkpoint_filename(problem, algorithm),
+                                                           Settings.getPropertyByID("checkpoint_interval").value))
+            else:
+                self.solver.setCheckpoint(None)
+
         def stopSolving(self):
             if self.solving:
                 self.showInfo("Arresto...")
                 self.solver.stopSolving()
 
+        def on_telemetry(self, sample):
+            # avanzamento della ricerca, mostrato al posto del messaggio "In Esecuzione..."
+            if not self.solving:
+                return
+            info = "In Esecuzione... {:.0f} s\nNodi Espansi : {}".format(sample["time"], sample["expanded"])
+            if sample["rate"] != None:
+                info += " ({:.0f}/s)".format(sample["rate"])
+            if sample["frontier"] != None:
+                info += "\nFrontiera : " + str(sample["frontier"])
+            if sample["explored"] != None:
+                info += " - Esplorati : " + str(sample["explored"])
+            if sample["depth"] != None:
+                info += "\nProfondità : " + str(sample["depth"])
+            if sample["bound"] != None:
+                info += " - Limite : " + str(sample["bound"])
+            if sample["memory"] != None:
+                info += "\nMemoria : {:.0f} MB".format(sample["memory"] / 2**20)
+            self.showInfo(info)
+
         def on_solved(self, success, result):
+            if success and not result.get("final", True):
+                # soluzione intermedia di un algoritmo anytime:
+                # viene mostrata mentre la ricerca continua
+                self.resetSolution()
+                self.solution = result["solution"]
+                self.showSolutionControls()
+                self.showSolutionStepCounter(update=True)
+                self.showInfo("Soluzione provvisoria (" + str(len(self.solution) - 1) + " azioni)")
+                return
             if success:
-                self.main.showMessage("Soluzione trovata in " + str(result["time"]) + " secondi" +
-                                     "\nNodi Espansi : " + str(result["expanded"]) +
-                                     "\nNodi Testati : " + str(result["tested"]))
+                message = "Soluzione trovata in " + str(result["time"]) + " secondi" + \
+                          "\nNodi Espansi : " + str(result["expanded"]) + \
+                          "\nNodi Testati : " + str(result["tested"])
+                if "original_length" in result:
+                    message += "\nPiano Ottimizzato : da " + str(result["original_length"]) + \
+                               " a " + str(len(result["solution"]) - 1) + " azioni"
+                if result.get("cached", False):
+                    message += "\nPiano letto dalla cache (ricerca originale: " + str(result["search_time"]) + " secondi)"
+                if "optimal" in result:
+                    message += "\nSoluzione Ottima : " + ("Sì" if result["optimal"] else "Non garantita")
+                if "omission_probability" in result:
+                    message += "\nProbabilità di Omissione : " + "{:.2e}".format(result["omission_probability"])
+                self.main.showMessage(message)
                 self.modelControlPanel.setActive("stop")
                 self.solving = False
                 self.solution = result["solution"]
@@ -478,7 +558,7 @@ class ModelPage(Page):
                 self.showInfo("Stato Iniziale")
                 return
             else:
-                self.main.showMessage("Nessuna Soluzione Trovata")
+                self.main.showMessage(result.get("error", "Nessuna Soluzione Trovata"))
                 self.modelControlPanel.setActive("stop")
                 self.solving = False
                 self.showInfo("Modello")
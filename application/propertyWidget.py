@@ -47,4 +47,24 @@ class PropertyOptionsMenu(Frame):
                         border=0, highlightthickness=0, pady=10, width=22)
 
         propLabel.pack(side=TOP, pady=(0,10))
-        optMenu.pack(side=BOTTOM)
\ No newline at end of file
+        optMenu.pack(side=BOTTOM)
+
+
+class PropertyEntry(Frame):
+    def __init__(self, master, property, font = (Style.main_font_family, Style.font_size_M)) -> None:
+        super().__init__(master, bg=Style.back_color_light, border=0, borderwidth=0, padx=0, pady=10)
+
+        propLabel = Label(self, text=property.property_name, 
+                          font = font, 
+                          fg=Style.text_color, bg=Style.back_color_light, 
+                          border=0, borderwidth=0)
+
+        textVariable = StringVar(self)
+        textVariable.set(property.value)
+        textVariable.trace_add("write", lambda *args: property.set(textVariable.get()))
+        entry = Entry(self, textvariable=textVariable, font=font,
+                      background=Style.back_color_lighter, foreground=Style.text_color,
+                      insertbackground=Style.text_color, border=0, highlightthickness=0, width=24)
+
+        propLabel.pack(side=TOP, pady=(0,10))
+        entry.pack(side=BOTTOM, ipady=5)
@@ -46,6 +46,8 @@ class SettingsMenu(Frame):
                 self.addItem(PropertyCheck(self.propertiesFrame, property), TOP)
             elif property.type == Property.TYPE_MULTIPLE_OPTIONS:
                 self.addItem(PropertyOptionsMenu(self.propertiesFrame, property), TOP)
+            elif property.type == Property.TYPE_TEXT:
+                self.addItem(PropertyEntry(self.propertiesFrame, property), TOP)
 
     def addProperties(self, properties):
         for property in properties:
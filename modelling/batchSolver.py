@@ -0,0 +1,284 @@
+"""
+Risoluzione in batch dei modelli Block World, senza interfaccia grafica.
+
+Ogni modello indicato (file JSON, cartella di modelli oppure pattern glob) viene risolto
+con l'algoritmo scelto in un processo nuovo; i processi lavorano in parallelo.
+Per ogni modello viene scritta una riga JSON con il piano trovato, i nodi espansi
+e testati, il tempo di esecuzione e la memoria massima occupata dal processo
+(``getrusage``: essendo il processo dedicato alla ricerca, è la memoria massima della ricerca).
+
+Allo scadere del tempo massimo viene richiesto l'arresto della ricerca (vedi ``SearchSignal``),
+in modo che gli algoritmi anytime restituiscano la soluzione migliore trovata; se la ricerca
+non si arresta entro ``KILL_GRACE`` secondi (ad esempio perché impegnata nella costruzione
+dei database di pattern) il processo viene terminato dal processo principale.
+
+Utilizzo:
+
+    python -m modelling.batchSolver sample_models --algorithm "A* Search" [--goal random]
+                                    [--workers 4] [--timeout 60] [--output results.jsonl]
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import sys
+import threading
+import time
+
+from modelling.heuristicCheck import random_goal
+from modelling.model import BlockWorldModel
+from modelling.problem import BlockWorldProblem, ColorBasedBlockWorldProblem
+from modelling.solver import solver_dict, solve_problem_async
+from modelling.telemetry import peak_memory
+from utils.channel import SearchSignal
+
+# secondi concessi ad una ricerca, dopo il tempo massimo, per arrestarsi prima di essere terminata
+KILL_GRACE = 5
+
+
+def model_files(paths):
+    '''
+        Elenca i file dei modelli: ogni percorso può essere un file, una cartella
+        (di cui vengono presi tutti i file .json) oppure un pattern glob.
+    '''
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.json"))))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            files.extend(sorted(glob.glob(path)))
+    return list(dict.fromkeys(files))
+
+
+def make_problem(model, goal = "default", heuristic = "Fast", goal_moves = 6, seed = None):
+    '''
+        Formula il problema di un modello: basato sui colori (``goal = "default"``)
+        oppure con uno stato goal ottenuto con ``goal_moves`` mosse casuali (``goal = "random"``).
+    '''
+    if goal == "default":
+        if heuristic not in ColorBasedBlockWorldProblem.HEURISTICS:
+            heuristic = "Admissible"
+        return ColorBasedBlockWorldProblem(model, heuristic = heuristic)
+    return BlockWorldProblem(model, random_goal(model, goal_moves, seed), heuristic = heuristic)
+
+
+def solve_file(filename, algorithm, goal = "default", heuristic = "Fast", goal_moves = 6, seed = None,
+               timeout = None, test_limit = None, optimize_window = None, scratch_dir = None, max_bytes = None,
+               memory_bound = None):
+    '''
+        Risolve il modello salvato in ``filename`` (vedi ``solve_model``).
+    '''
+    try:
+        model = BlockWorldModel.loadFromFile(filename)
+    except Exception as e:
+        return {"model": filename, "algorithm": algorithm, "goal": goal, "heuristic": heuristic,
+                "status": "error", "error": "{}: {}".format(type(e).__name__, e), "time": 0}
+    return solve_model(model, filename, algorithm, goal, heuristic, goal_moves, seed,
+                       timeout, test_limit, optimize_window, scratch_dir, max_bytes, memory_bound)
+
+
+def solve_model(model, name, algorithm, goal = "default", heuristic = "Fast", goal_moves = 6, seed = None,
+                timeout = None, test_limit = None, optimize_window = None, scratch_dir = None, max_bytes = None,
+                memory_bound = None):
+    '''
+        Risolve un modello.
+
+        Parametri:
+
+            name : str
+                Nome del modello riportato nel risultato
+
+            scratch_dir, max_bytes :
+                Cartella dei file temporanei e memoria massima degli algoritmi
+                che salvano la ricerca su disco (vedi ``external_breadth_first_search``)
+
+            memory_bound : int
+                Memoria massima (in byte) degli algoritmi con limite di memoria
+                (vedi ``memory_bounded_astar_search``)
+
+        Valori restituiti:
+
+            Dizionario con il risultato della ricerca, serializzabile in JSON. Il campo ``status``
+            vale "solved", "no_solution", "timeout" (ricerca arrestata senza soluzione) oppure
+            "error"; ``peak_memory`` è la memoria massima (in byte) occupata dal processo, e
+            ``children_peak_memory`` quella del più grande dei processi avviati dalla ricerca.
+            Le misure di memoria sono significative solo se il processo esegue una sola ricerca
+            (vedi ``run_isolated``).
+    '''
+    record = {"model": name, "algorithm": algorithm, "goal": goal, "heuristic": heuristic}
+    start = time.time()
+    try:
+        problem = make_problem(model, goal, heuristic, goal_moves, seed)
+
+        stop_signal = SearchSignal()
+        timer = None
+        if timeout != None:
+            timer = threading.Timer(timeout, stop_signal.stop)
+            timer.daemon = True
+            timer.start()
+
+        outcome = []
+        solve_problem_async(problem, solver_dict[algorithm], stop_signal, threading.Event(),
+                            lambda success, info: outcome.append((success, info)), test_limit,
+                            optimize_window = optimize_window,
+                            scratch_dir = scratch_dir, external_max_bytes = max_bytes,
+                            memory_bound = memory_bound)
+        if timer != None:
+            timer.cancel()
+
+        success, info = outcome[-1]
+        if success:
+            solution = info.pop("solution")
+            info.pop("final", None)
+            record.update(info)
+            record["status"] = "solved"
+            record["length"] = len(solution) - 1
+            record["plan"] = [str(node.action) for node in solution[1:]]
+        else:
+            record["status"] = "timeout" if stop_signal.stopped else "no_solution"
+            if "error" in info:
+                record["status"] = "error"
+                record["error"] = info["error"]
+
+        record["peak_memory"] = peak_memory()
+        children = peak_memory(children = True)
+        if children:
+            record["children_peak_memory"] = children
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = "{}: {}".format(type(e).__name__, e)
+    # per le ricerche concluse è il tempo di ricerca, altrimenti il tempo trascorso
+    record.setdefault("time", time.time() - start)
+    return record
+
+
+def run_isolated(calls, workers = 1, timeout = None):
+    '''
+        Esegue ogni chiamata in un processo nuovo, al più ``workers`` processi alla volta.
+
+        Parametri:
+
+            calls : list
+                Lista di terne (funzione, argomenti, risultato di riserva): il risultato di riserva,
+                completato con stato e tempo, sostituisce quello di un processo terminato
+
+            timeout : float
+                Secondi dopo i quali (più ``KILL_GRACE``) un processo viene terminato
+
+        Valori restituiti:
+
+            Generatore di coppie (indice della chiamata, risultato), nell'ordine in cui
+            i risultati sono disponibili.
+    '''
+    # il metodo spawn avvia un interprete nuovo, che non eredita la memoria del processo principale
+    context = multiprocessing.get_context("spawn")
+    pending = list(enumerate(calls))[::-1]
+    running = {}
+    while len(pending) > 0 or len(running) > 0:
+        while len(pending) > 0 and len(running) < workers:
+            index, (function, args, fallback) = pending.pop()
+            receiver, sender = context.Pipe(duplex = False)
+            process = context.Process(target = _call, args = (sender, function, args))
+            process.start()
+            sender.close()
+            running[receiver] = (index, process, fallback, time.time())
+
+        wait = None
+        if timeout != None:
+            deadline = min(start for _, _, _, start in running.values()) + timeout + KILL_GRACE
+            wait = max(0, deadline - time.time())
+        ready = multiprocessing.connection.wait(list(running.keys()), wait)
+
+        now = time.time()
+        for receiver in list(running.keys()):
+            index, process, fallback, start = running[receiver]
+            if receiver in ready:
+                try:
+                    record = receiver.recv()
+                except EOFError:
+                    # processo terminato senza restituire un risultato
+                    process.join()
+                    record = dict(fallback, status = "error", time = now - start,
+                                  error = "processo terminato con codice {}".format(process.exitcode))
+            elif timeout != None and now - start >= timeout + KILL_GRACE:
+                _terminate(process)
+                record = dict(fallback, status = "timeout", time = now - start)
+            else:
+                continue
+            process.join()
+            receiver.close()
+            del running[receiver]
+            yield index, record
+
+
+def _call(connection, function, args):
+    # SIGTERM interrompe la ricerca con SystemExit, in modo che
+    # vengano terminati anche i processi avviati dalla ricerca
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+    connection.send(function(*args))
+    connection.close()
+
+
+def _terminate(process):
+    process.terminate()
+    process.join(1)
+    if process.is_alive():
+        process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Risoluzione in batch dei modelli Block World")
+    parser.add_argument("models", nargs="+", help="file, cartelle o pattern glob dei modelli")
+    parser.add_argument("--algorithm", default="A* Search", choices=list(solver_dict.keys()))
+    parser.add_argument("--goal", default="default", choices=["default", "random"],
+                        help="goal basato sui colori oppure ottenuto con mosse casuali")
+    parser.add_argument("--goal-moves", type=int, default=6, help="mosse casuali per generare lo stato goal")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--heuristic", default="Fast", choices=["Fast", "Admissible", "Pattern Database", "Blind"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processi in parallelo")
+    parser.add_argument("--timeout", type=float, default=None, help="secondi massimi per ogni modello")
+    parser.add_argument("--test-limit", type=int, default=None, help="nodi testati massimi per ogni modello")
+    parser.add_argument("--optimize", type=int, default=None, metavar="WINDOW",
+                        help="accorcia i piani trovati con finestre di WINDOW azioni")
+    parser.add_argument("--scratch-dir", default=None,
+                        help="cartella dei file temporanei degli algoritmi su disco (di default quella di sistema)")
+    parser.add_argument("--max-bytes", type=int, default=None,
+                        help="memoria massima (in byte) degli algoritmi su disco")
+    parser.add_argument("--memory-bound", type=int, default=None,
+                        help="memoria massima (in byte) degli algoritmi con limite di memoria")
+    parser.add_argument("--output", default=None, help="file JSON lines dei risultati (di default lo standard output)")
+    args = parser.parse_args()
+
+    files = model_files(args.models)
+    if len(files) == 0:
+        print("Nessun modello trovato", file=sys.stderr)
+        return 1
+
+    outfile = open(args.output, "w") if args.output != None else sys.stdout
+    errors = 0
+    try:
+        calls = [(solve_file, (filename, args.algorithm, args.goal, args.heuristic, args.goal_moves, args.seed,
+                               args.timeout, args.test_limit, args.optimize, args.scratch_dir, args.max_bytes,
+                               args.memory_bound),
+                  {"model": filename, "algorithm": args.algorithm, "goal": args.goal, "heuristic": args.heuristic})
+                 for filename in files]
+        # i risultati vengono scritti appena disponibili
+        for _, record in run_isolated(calls, args.workers, args.timeout):
+            errors += record["status"] == "error"
+            outfile.write(json.dumps(record) + "\n")
+            outfile.flush()
+    finally:
+        if outfile is not sys.stdout:
+            outfile.close()
+
+    return 1 if errors > 0 else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
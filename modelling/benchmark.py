@@ -0,0 +1,220 @@
+"""
+Benchmark degli algoritmi di ricerca.
+
+Ogni algoritmo di ``solver_dict`` viene eseguito, con entrambi i tipi di problema
+(goal basato sui colori e goal ottenuto con mosse casuali), sui modelli di riferimento
+``sample_models/comp_test_*.json`` e su un insieme di modelli casuali generati con
+``BlockWorldModel.random`` a partire da un seme fissato (solo modelli risolvibili, in modo
+che anche il problema basato sui colori misuri una ricerca). Di ogni esecuzione vengono
+registrati esito, tempo, nodi espansi, memoria massima e lunghezza del piano.
+
+I risultati possono essere salvati come riferimento (``--save-baseline``) e confrontati
+con un riferimento salvato in precedenza: vengono segnalate come regressioni le esecuzioni
+il cui esito cambia (ad esempio non trovano più una soluzione) e quelle in cui tempo, nodi espansi, memoria o lunghezza
+del piano crescono oltre la soglia indicata.
+
+Ogni esecuzione avviene in un processo nuovo (vedi ``run_isolated``), terminato se non si
+arresta entro il tempo massimo; la memoria massima è quella misurata con ``getrusage``.
+Per misurare tempi confrontabili le esecuzioni sono di default sequenziali.
+
+Il riferimento dipende dalla macchina e non fa parte del repository: senza un riferimento
+da confrontare (e senza ``--save-baseline``) il benchmark termina con un errore.
+
+Utilizzo:
+
+    python -m modelling.benchmark [--save-baseline] [--baseline settings/benchmark_baseline.json]
+                                  [--algorithms "A* Search" ...] [--timeout 10] [--threshold 0.2]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+from application.appSettings import Settings
+from modelling.batchSolver import run_isolated, solve_model
+from modelling.model import BlockWorldModel
+from modelling.problem import ColorBasedBlockWorldProblem
+from modelling.solver import solver_dict
+from modelling.stateSpaceSearch import astar_search
+
+BASELINE_FILE = "settings/benchmark_baseline.json"
+
+# valori confrontati con il riferimento e minima differenza assoluta
+# considerata (per non segnalare variazioni dovute solo al rumore di misura)
+METRICS = {
+    "time": 0.05,
+    "expanded": 10,
+    "peak_memory": 16 * 2**20,
+    "length": 0
+}
+
+
+def benchmark_models(models = "sample_models/comp_test_*.json", random_sizes = (8, 10, 12), seed = 0):
+    '''
+        Restituisce la lista di coppie (nome, modello) del benchmark: i modelli di riferimento
+        ed un modello casuale risolvibile per ogni dimensione di ``random_sizes``.
+    '''
+    cases = [(os.path.basename(filename), BlockWorldModel.loadFromFile(filename))
+             for filename in sorted(glob.glob(models))]
+    if len(random_sizes) > 0:
+        Settings.loadFromFile()
+        for n_blocks in random_sizes:
+            model, seed = solvable_random_model(n_blocks, Settings.COLORS, seed)
+            if model != None:
+                cases.append(("random_{}b_{}".format(n_blocks, seed), model))
+            seed += 1
+    return cases
+
+
+def solvable_random_model(n_blocks, colors, seed = 0, max_attempts = 100, test_limit = 100000):
+    '''
+        Genera un modello casuale il cui problema basato sui colori ha soluzione,
+        provando i semi successivi a ``seed`` finché non ne trova uno.
+
+        Parametri:
+
+            test_limit : int
+                Nodi testati massimi della ricerca che verifica se il problema ha soluzione:
+                i modelli per cui non viene trovata entro il limite vengono scartati
+
+        Valori restituiti:
+
+            Coppia formata dal modello e dal seme utilizzato (il modello è None
+            se nessuno dei ``max_attempts`` semi provati produce un modello risolvibile).
+    '''
+    for attempt in range(max_attempts):
+        model = BlockWorldModel.random(n_blocks, colors, seed = seed + attempt)
+        if astar_search(ColorBasedBlockWorldProblem(model), test_limit = test_limit) != None:
+            return model, seed + attempt
+    return None, seed + max_attempts - 1
+
+
+def run_benchmark(cases, algorithms, goals = ("default", "random"), goal_moves = 12, seed = 0,
+                  timeout = 10, repeat = 1, workers = 1):
+    '''
+        Esegue il benchmark.
+
+        Parametri:
+
+            repeat : int
+                Numero di esecuzioni di ogni caso: viene registrato il tempo minore
+
+        Valori restituiti:
+
+            Dizionario che associa alla chiave "modello | goal | algoritmo" il risultato
+            dell'esecuzione (esito, tempo, nodi espansi, memoria massima e lunghezza del piano).
+    '''
+    keys, calls = [], []
+    for name, model in cases:
+        for goal in goals:
+            for algorithm in algorithms:
+                keys.append(" | ".join([name, goal, algorithm]))
+                calls.extend([(solve_model, (model, name, algorithm, goal, "Fast", goal_moves, seed, timeout),
+                               {"model": name, "algorithm": algorithm, "goal": goal, "heuristic": "Fast"})
+                              for _ in range(repeat)])
+
+    runs = {}
+    for index, record in run_isolated(calls, workers, timeout):
+        runs.setdefault(keys[index // repeat], []).append(record)
+
+    results = {}
+    for key in keys:
+        record = min(runs[key], key = lambda r: r["time"])
+        results[key] = {
+            "status": record["status"],
+            "time": record["time"],
+            "expanded": record.get("expanded"),
+            "peak_memory": record.get("peak_memory"),
+            "length": record.get("length")
+        }
+    return results
+
+
+def compare(results, baseline, threshold = 0.2):
+    '''
+        Confronta i risultati con quelli di riferimento.
+
+        Valori restituiti:
+
+            Lista di messaggi, uno per ogni regressione trovata.
+    '''
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference == None:
+            continue
+        # un esito definitivo (soluzione trovata o problema senza soluzione) non deve cambiare
+        if reference["status"] in ("solved", "no_solution") and result["status"] != reference["status"]:
+            regressions.append("{}: {} (riferimento: {})".format(key, result["status"], reference["status"]))
+            continue
+        if result["status"] != "solved" or reference["status"] != "solved":
+            continue
+        for metric, min_difference in METRICS.items():
+            old, new = reference.get(metric), result.get(metric)
+            if old == None or new == None:
+                continue
+            # la lunghezza del piano non deve crescere, le altre misure possono variare entro la soglia
+            limit = old if metric == "length" else old * (1 + threshold)
+            if new > limit and new - old > min_difference:
+                regressions.append("{}: {} {} -> {}".format(key, metric, _format(metric, old), _format(metric, new)))
+    return regressions
+
+
+def _format(metric, value):
+    if metric == "time":
+        return "{:.3f}s".format(value)
+    if metric == "peak_memory":
+        return "{:.0f}MB".format(value / 2**20)
+    return str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark degli algoritmi di ricerca")
+    parser.add_argument("--models", default="sample_models/comp_test_*.json", help="pattern glob dei modelli di riferimento")
+    parser.add_argument("--random-sizes", type=int, nargs="*", default=[8, 10, 12],
+                        help="numero di blocchi dei modelli casuali")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--goal-moves", type=int, default=12, help="mosse casuali per generare lo stato goal")
+    parser.add_argument("--algorithms", nargs="+", default=list(solver_dict.keys()), choices=list(solver_dict.keys()))
+    parser.add_argument("--timeout", type=float, default=10, help="secondi massimi per ogni esecuzione")
+    parser.add_argument("--repeat", type=int, default=1, help="esecuzioni di ogni caso (viene registrato il tempo minore)")
+    parser.add_argument("--workers", type=int, default=1, help="esecuzioni in parallelo (i tempi diventano meno affidabili)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="file dei risultati di riferimento")
+    parser.add_argument("--save-baseline", action="store_true", help="salva i risultati come riferimento")
+    parser.add_argument("--threshold", type=float, default=0.2, help="crescita relativa oltre la quale segnalare una regressione")
+    args = parser.parse_args()
+
+    cases = benchmark_models(args.models, args.random_sizes, args.seed)
+    results = run_benchmark(cases, args.algorithms, goal_moves = args.goal_moves, seed = args.seed,
+                            timeout = args.timeout, repeat = args.repeat, workers = args.workers)
+
+    for key, r in results.items():
+        print("{:<70} {:<12} {:>9} {:>10} {:>7} {:>6}".format(
+              key, r["status"], _format("time", r["time"]), str(r["expanded"]),
+              _format("peak_memory", r["peak_memory"]) if r["peak_memory"] != None else "-",
+              str(r["length"]) if r["length"] != None else "-"))
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as outfile:
+            json.dump(results, outfile, indent=2)
+        print("Riferimento salvato in " + args.baseline)
+        return 0
+
+    if not os.path.isfile(args.baseline):
+        print("Nessun riferimento da confrontare (" + args.baseline + "): usare --save-baseline", file=sys.stderr)
+        return 2
+
+    with open(args.baseline) as infile:
+        baseline = json.load(infile)
+    regressions = compare(results, baseline, args.threshold)
+    for message in regressions:
+        print("REGRESSIONE " + message)
+    print("{} regressioni su {} esecuzioni".format(len(regressions), len(results)))
+    return 1 if len(regressions) > 0 else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
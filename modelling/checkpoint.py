@@ -0,0 +1,261 @@
+"""
+Checkpoint delle ricerche su grafo.
+
+Una ricerca che riceve un ``SearchCheckpoint`` salva periodicamente su disco (e quando
+viene interrotta) la frontiera, gli stati esplorati ed i contatori; se il file esiste già
+la ricerca riparte dallo stato salvato invece che dallo stato iniziale. Il file può quindi
+essere copiato su un'altra macchina per proseguire la ricerca.
+
+Gli stati vengono salvati compattati (vedi ``BlockEncoder.packState``). I nodi della
+frontiera vengono salvati insieme ai loro antenati in una tabella in cui ogni nodo
+riporta l'indice del padre, l'azione ed il costo del percorso.
+
+Il file (compresso con gzip) contiene una riga di intestazione JSON, con versione,
+identificativo della ricerca, contatori e dimensione delle sezioni, seguita dalle sezioni
+binarie (stati, padri, azioni, costi, frontiera e stati esplorati). Il file non contiene
+oggetti Python: caricare un checkpoint non può eseguire codice, e le sezioni vengono lette
+solo se l'intestazione appartiene alla ricerca in corso.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+
+from modelling.stateSpaceSearch import Node
+
+CHECKPOINT_DIR = "settings/checkpoints"
+CHECKPOINT_VERSION = 2
+
+# sezioni binarie del file, nell'ordine in cui vengono scritte, con il tipo degli elementi
+# (None per le sequenze di stati compattati)
+SECTIONS = [("states", None), ("parents", "q"), ("actions", "q"), ("costs", "d"),
+            ("frontier", "q"), ("explored", None)]
+
+class CheckpointException(Exception):
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
+
+    def __str__(self) -> str:
+        return "Checkpoint non valido: " + super().__str__()
+
+
+class SearchCheckpoint():
+    '''
+        Checkpoint di una ricerca.
+
+        Parametri:
+
+            filename : str
+                File in cui salvare il checkpoint
+
+            interval : float
+                Secondi tra due salvataggi consecutivi (None per salvare solo all'arresto)
+
+            resume : bool
+                Se True e il file esiste, la ricerca riprende dallo stato salvato
+    '''
+
+    def __init__(self, filename, interval = 300, resume = True) -> None:
+        self.filename = filename
+        self.interval = interval
+        self.resume = resume
+        self.problem = None
+        self.fingerprint = None
+        self.last_save = time.time()
+
+    def bind(self, problem, search):
+        '''
+            Associa il checkpoint al problema ed all'algoritmo di ricerca.
+            Il problema deve avere un codificatore (``problem.encoder``).
+        '''
+        if not hasattr(problem, "encoder"):
+            raise CheckpointException("il problema non supporta il salvataggio degli stati")
+        self.problem = problem
+        self.fingerprint = problem_fingerprint(problem, search)
+        self.state_size = problem.encoder.packedSize(len(problem.initial.model))
+        self.last_save = time.time()
+
+    def restore(self):
+        '''
+            Carica il checkpoint salvato.
+
+            Valori restituiti:
+
+                Dizionario con i nodi della frontiera nell'ordine in cui erano in coda
+                (``frontier``), l'insieme degli stati esplorati (``explored``) ed i contatori
+                ``expanded`` e ``tested``; None se il file non esiste o ``resume`` è False.
+        '''
+        if not self.resume or not os.path.isfile(self.filename):
+            return None
+        try:
+            with gzip.open(self.filename, "rb") as infile:
+                header = json.loads(infile.readline(4096).decode("utf-8"))
+                if not isinstance(header, dict) or header.get("version") != CHECKPOINT_VERSION \
+                   or header.get("fingerprint") != self.fingerprint:
+                    raise CheckpointException("il file " + self.filename + " appartiene ad un'altra ricerca")
+                data = {}
+                for name, typecode in SECTIONS:
+                    data[name] = _read_section(infile, header["sizes"][name], typecode)
+            return self._rebuild(header, data)
+        except (OSError, EOFError, ValueError, KeyError, TypeError, IndexError, struct.error) as e:
+            raise CheckpointException(str(e))
+
+    def _rebuild(self, header, data):
+        # ricostruisce i nodi controllando che la tabella sia coerente:
+        # ogni padre precede i suoi discendenti ed ogni indice è valido
+        encoder = self.problem.encoder
+        states, parents = data["states"], data["parents"]
+        n_nodes = len(parents)
+        if len(states) != n_nodes * self.state_size or len(data["actions"]) != n_nodes \
+           or len(data["costs"]) != n_nodes or len(data["explored"]) % self.state_size != 0:
+            raise CheckpointException("dimensione delle sezioni errata")
+        if not isinstance(header["expanded"], int) or not isinstance(header["tested"], int):
+            raise CheckpointException("contatori non validi")
+
+        nodes = []
+        for i, parent in enumerate(parents):
+            state = self._unpack(states, i * self.state_size)
+            cost = data["costs"][i]
+            cost = int(cost) if cost.is_integer() else cost
+            if parent < 0:
+                nodes.append(Node(state, path_cost=cost))
+            elif parent < i:
+                nodes.append(Node(state, nodes[parent], data["actions"][i], cost))
+            else:
+                raise CheckpointException("indice del padre non valido")
+
+        if any(i < 0 or i >= n_nodes for i in data["frontier"]):
+            raise CheckpointException("indice della frontiera non valido")
+        explored = data["explored"]
+        return {
+            "frontier": [nodes[i] for i in data["frontier"]],
+            "explored": set(self._unpack(explored, i) for i in range(0, len(explored), self.state_size)),
+            "expanded": header["expanded"],
+            "tested": header["tested"]
+        }
+
+    def _unpack(self, data, offset):
+        # uno stato deve contenere ogni blocco del problema una sola volta
+        state = self.problem.encoder.unpackState(data[offset:offset + self.state_size])
+        blocks = [b for stack in state.model for b in stack] + ([state.hand] if state.hand != None else [])
+        if sorted(blocks) != list(range(len(self.problem.encoder.blocks))):
+            raise CheckpointException("stato non valido")
+        return state
+
+    def due(self):
+        '''
+            Indica se è trascorso l'intervallo di salvataggio
+        '''
+        return self.interval != None and time.time() - self.last_save >= self.interval
+
+    def save(self, frontier, explored, expanded, tested):
+        '''
+            Salva su file i nodi della frontiera (nell'ordine in cui devono essere estratti),
+            gli stati esplorati ed i contatori della ricerca.
+        '''
+        encoder = self.problem.encoder
+        index = {}
+        states, parents, actions, costs = [], array("q"), array("q"), array("d")
+
+        def add(node):
+            # gli antenati vengono inseriti prima dei discendenti
+            chain = []
+            while node != None and id(node) not in index:
+                chain.append(node)
+                node = node.parent
+            for n in reversed(chain):
+                index[id(n)] = len(parents)
+                states.append(encoder.packState(n.state))
+                parents.append(index[id(n.parent)] if n.parent != None else -1)
+                actions.append(n.action if n.action != None else -1)
+                costs.append(n.path_cost)
+
+        queue = array("q")
+        for node in frontier:
+            add(node)
+            queue.append(index[id(node)])
+
+        data = {
+            "states": b"".join(states),
+            "parents": parents,
+            "actions": actions,
+            "costs": costs,
+            "frontier": queue,
+            "explored": b"".join(encoder.packState(state) for state in explored)
+        }
+        sections = [_section_bytes(data[name], typecode) for name, typecode in SECTIONS]
+        header = {
+            "version": CHECKPOINT_VERSION,
+            "fingerprint": self.fingerprint,
+            "expanded": expanded,
+            "tested": tested,
+            "sizes": {name: len(section) for (name, _), section in zip(SECTIONS, sections)}
+        }
+
+        directory = os.path.dirname(self.filename)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+        # il file viene scritto con un nome temporaneo e poi rinominato,
+        # in modo da non perdere il checkpoint precedente in caso di interruzione
+        with gzip.open(self.filename + ".tmp", "wb", compresslevel=1) as outfile:
+            outfile.write(json.dumps(header).encode("utf-8") + b"\n")
+            for section in sections:
+                outfile.write(section)
+        os.replace(self.filename + ".tmp", self.filename)
+        self.last_save = time.time()
+
+    def clear(self):
+        '''
+            Elimina il checkpoint di una ricerca terminata
+        '''
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+
+def _section_bytes(values, typecode):
+    # gli array vengono salvati little endian, indipendentemente dalla macchina
+    if typecode != None and sys.byteorder != "little":
+        values = array(typecode, values)
+        values.byteswap()
+    return bytes(values)
+
+
+def _read_section(infile, size, typecode):
+    if not isinstance(size, int) or size < 0:
+        raise CheckpointException("dimensione delle sezioni errata")
+    data = infile.read(size)
+    if len(data) != size:
+        raise CheckpointException("file troncato")
+    if typecode == None:
+        return data
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def problem_fingerprint(problem, search):
+    '''
+        Identifica una ricerca: dipende dall'algoritmo, dal tipo di problema, dai blocchi,
+        dagli stati iniziale e goal e dall'euristica utilizzata.
+    '''
+    encoder = problem.encoder
+    layout = [search, type(problem).__name__, getattr(problem, "heuristic", None),
+              [str(block.id) for block in encoder.blocks], encoder.packState(problem.initial).hex()]
+    if problem.goal != None:
+        layout.append(encoder.packState(problem.goal).hex())
+    return hashlib.sha1(repr(layout).encode("utf-8")).hexdigest()
+
+
+def checkpoint_filename(problem, algorithm, directory = CHECKPOINT_DIR):
+    '''
+        Nome del file di checkpoint di un problema risolto con ``algorithm``:
+        la stessa ricerca, ripetuta, utilizza sempre lo stesso file.
+    '''
+    return os.path.join(directory, problem_fingerprint(problem, algorithm) + ".ckpt")
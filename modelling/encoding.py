@@ -0,0 +1,206 @@
+import itertools
+import struct
+
+class BlockEncoder():
+    '''
+        Rappresentazione compatta degli stati del problema Block World.
+
+        Ad ogni blocco del modello viene associato un piccolo intero (l'indice del blocco
+        nella lista ordinata per identificativo). Un modello viene quindi rappresentato
+        come una tupla di pile, dove ogni pila è una tupla di interi, mentre uno stato
+        (vedi ``EncodedState``) è una coppia (m, h) in cui h è l'intero associato al blocco
+        in mano al robot oppure None.
+
+        L'encoder genera inoltre le chiavi Zobrist utilizzate per calcolare in modo
+        incrementale l'hash degli stati: ad ogni terna (blocco, pila, altezza) ed
+        al blocco in mano al robot è associato un intero a 64 bit, e l'hash di uno stato
+        è lo XOR delle chiavi di tutti i suoi elementi.
+
+        La conversione verso gli oggetti ``Block`` avviene solo al termine della ricerca,
+        quando la soluzione deve essere mostrata all'utente.
+    '''
+
+    def __init__(self, model, hand = None) -> None:
+        blocks = list(itertools.chain.from_iterable(model))
+        if hand != None:
+            blocks.append(hand)
+        blocks.sort(key = lambda b : b.id)
+
+        self.blocks = tuple(blocks)
+        self.index = {b.id : i for i,b in enumerate(self.blocks)}
+        self.keys = {}
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def encodeBlock(self, block):
+        '''
+            Restituisce l'intero associato ad un blocco (None se il blocco è None)
+        '''
+        if block == None:
+            return None
+        return self.index[block.id]
+
+    def decodeBlock(self, code):
+        '''
+            Restituisce il blocco associato ad un intero (None se l'intero è None)
+        '''
+        if code == None:
+            return None
+        return self.blocks[code]
+
+    def encodeModel(self, model):
+        '''
+            Converte un modello di blocchi in una tupla di pile di interi
+        '''
+        return tuple(tuple(self.index[b.id] for b in stack) for stack in model)
+
+    def decodeModel(self, model):
+        '''
+            Converte una tupla di pile di interi nel modello di blocchi equivalente
+        '''
+        return tuple(tuple(self.blocks[b] for b in stack) for stack in model)
+
+    def blockKey(self, block, stack_index, height):
+        '''
+            Chiave Zobrist associata al blocco ``block`` in posizione ``height`` della pila ``stack_index``
+        '''
+        index = (((block << 16) | stack_index) << 16 | height) << 1
+        key = self.keys.get(index)
+        if key == None:
+            key = self.keys[index] = zobrist_key(index)
+        return key
+
+    def handKey(self, block):
+        '''
+            Chiave Zobrist associata al blocco ``block`` in mano al robot
+        '''
+        index = (block << 1) | 1
+        key = self.keys.get(index)
+        if key == None:
+            key = self.keys[index] = zobrist_key(index)
+        return key
+
+    def stateKey(self, model, hand = None):
+        '''
+            Calcola da zero l'hash Zobrist di uno stato codificato
+        '''
+        key = 0
+        for i,stack in enumerate(model):
+            for j,block in enumerate(stack):
+                key ^= self.blockKey(block, i, j)
+        if hand != None:
+            key ^= self.handKey(hand)
+        return key
+
+    def encodeState(self, model, hand = None):
+        model = self.encodeModel(model)
+        hand = self.encodeBlock(hand)
+        return EncodedState(model, hand, self.stateKey(model, hand))
+
+    def decodeState(self, state):
+        return (self.decodeModel(state.model), self.decodeBlock(state.hand))
+
+    def packedSize(self, n_stacks):
+        '''
+            Dimensione in byte degli stati compattati con ``packState`` per un modello di ``n_stacks`` pile
+        '''
+        return 2 * (1 + n_stacks + len(self.blocks))
+
+    def packState(self, state):
+        '''
+            Compatta uno stato codificato in una sequenza di byte di lunghezza fissa.
+
+            La sequenza contiene, come interi a 16 bit, il blocco in mano al robot,
+            l'altezza di ogni pila ed i blocchi di ogni pila dal basso verso l'alto;
+            il valore 0xFFFF indica la mano vuota e completa la sequenza quando
+            il robot ha un blocco in mano. Confrontare le sequenze di byte equivale
+            quindi a confrontare gli stati.
+        '''
+        values = [0xFFFF if state.hand == None else state.hand]
+        values.extend(len(stack) for stack in state.model)
+        for stack in state.model:
+            values.extend(stack)
+        values.extend([0xFFFF] * (len(self.blocks) + 1 + len(state.model) - len(values)))
+        return struct.pack(">%dH" % len(values), *values)
+
+    def unpackState(self, data):
+        '''
+            Ricostruisce lo stato codificato compattato con ``packState``
+        '''
+        values = struct.unpack(">%dH" % (len(data) // 2), data)
+        n_stacks = len(values) - 1 - len(self.blocks)
+        hand = None if values[0] == 0xFFFF else values[0]
+        model = []
+        position = 1 + n_stacks
+        for height in values[1:1 + n_stacks]:
+            model.append(values[position:position + height])
+            position += height
+        model = tuple(model)
+        return EncodedState(model, hand, self.stateKey(model, hand))
+
+
+class EncodedState():
+    '''
+        Stato codificato del problema Block World.
+
+        Oltre al modello ``model`` ed al blocco in mano al robot ``hand``, lo stato
+        memorizza il proprio hash Zobrist ``key``, aggiornato in tempo costante ad ogni
+        azione a partire da quello dello stato padre. Hash ed uguaglianza consentono
+        quindi di utilizzare gli stati come chiavi di insiemi e dizionari senza dover
+        ricalcolare ogni volta l'hash dell'intera tupla: il confronto esatto
+        tra i modelli avviene solo in caso di collisione.
+    '''
+
+    __slots__ = ("model", "hand", "key")
+
+    def __init__(self, model, hand, key) -> None:
+        self.model = model
+        self.hand = hand
+        self.key = key
+
+    def __getitem__(self, index):
+        # compatibilità con la rappresentazione (m, h)
+        return (self.model, self.hand)[index]
+
+    def __eq__(self, o: object) -> bool:
+        return isinstance(o, EncodedState) and self.key == o.key \
+               and self.hand == o.hand and self.model == o.model
+
+    def __lt__(self, o: object) -> bool:
+        return self.key < o.key
+
+    def __hash__(self) -> int:
+        return self.key
+
+    def __repr__(self) -> str:
+        return "<EncodedState {} {}>".format(self.model, self.hand)
+
+    def __reduce__(self):
+        # serializzazione compatta, usata per scambiare stati tra processi
+        return (EncodedState, (self.model, self.hand, self.key))
+
+
+def zobrist_key(index):
+    '''
+        Restituisce una chiave pseudo-casuale a 64 bit associata ad un intero (funzione splitmix64).
+        La chiave dipende solo dall'intero dato, per cui è la stessa in ogni processo.
+    '''
+    z = (index * 0x9E3779B97F4A7C15 + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return z ^ (z >> 31)
+
+
+def encode_action(type, stack_index):
+    '''
+        Codifica una azione come intero: i due bit meno significativi
+        contengono il tipo di azione, i restanti l'indice della pila coinvolta.
+    '''
+    return (stack_index << 2) | type
+
+def action_type(code):
+    return code & 3
+
+def action_stack(code):
+    return code >> 2
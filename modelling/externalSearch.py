@@ -0,0 +1,230 @@
+"""
+Ricerca in ampiezza in memoria esterna.
+
+La frontiera e gli stati già esplorati non vengono mantenuti in memoria ma scritti su
+file, un file per ogni livello della ricerca. Ogni file contiene record di lunghezza fissa
+ordinati per stato: lo stato compattato (vedi ``BlockEncoder.packState``), lo stato padre
+e l'azione che li collega. I successori di un livello vengono accumulati in memoria fino
+al limite stabilito, ordinati e scritti in file temporanei; al termine del livello i file
+vengono uniti eliminando i duplicati e gli stati già presenti nei livelli precedenti.
+"""
+
+import heapq
+import os
+import struct
+import sys
+import tempfile
+
+from modelling.stateSpaceSearch import Node, Problem
+
+_ACTION = struct.Struct(">I")
+_READ_RECORDS = 4096
+
+
+def external_breadth_first_search(problem, endpoint = None, test_limit = None,
+                                  scratch_dir = None, max_bytes = 64 * 2**20):
+    '''
+        Ricerca in ampiezza con frontiera e stati esplorati su disco.
+
+        Conteggi e percorso restituiti hanno lo stesso significato di quelli di
+        ``breadth_first_graph_search``, ma gli stati duplicati di uno stesso livello
+        vengono eliminati solo al termine del livello e sono quindi contati tra i nodi espansi.
+
+        Se le azioni del problema sono reversibili (il problema implementa ``inverse_action``)
+        i successori di un livello possono trovarsi solo nel livello stesso o in quello
+        precedente, per cui vengono confrontati solo con questi due livelli.
+
+        Parametri:
+
+            scratch_dir : str
+                Cartella in cui creare i file temporanei (di default quella di sistema).
+                I file vengono eliminati al termine della ricerca
+
+            max_bytes : int
+                Memoria massima occupata dai successori in attesa di essere scritti su file
+    '''
+    tested = 0
+    expanded = 0
+
+    if problem.goal_test(problem.initial):
+        return Node(problem.initial), 1, 0
+
+    if endpoint != None:
+        message = endpoint.receive()
+        if message != None and "continue" in message:
+            run = message["continue"]
+        else: run = True
+    else: run = True
+
+    encoder = problem.encoder
+    state_size = encoder.packedSize(len(problem.initial.model))
+    record_size = 2 * state_size + _ACTION.size
+    no_parent = b"\xff" * state_size
+    # ogni record in memoria occupa anche lo spazio dell'oggetto bytes e del riferimento nella lista
+    max_records = max(1, max_bytes // (sys.getsizeof(b"") + record_size + 8))
+    reversible = type(problem).inverse_action is not Problem.inverse_action
+
+    with tempfile.TemporaryDirectory(prefix="external_bfs_", dir=scratch_dir) as scratch:
+
+        layers = [os.path.join(scratch, "layer_0")]
+        with open(layers[0], "wb") as outfile:
+            outfile.write(encoder.packState(problem.initial) + no_parent + _ACTION.pack(0))
+
+        while run:
+
+            runs = []
+            buffer = []
+
+            for record in _read_records(layers[-1], record_size):
+                parent = record[:state_size]
+                state = encoder.unpackState(parent)
+
+                for action in problem.actions(state):
+                    child = problem.result(state, action)
+                    expanded += 1
+                    if problem.goal_test(child):
+                        actions = _trace_actions(layers, parent, state_size, record_size) + [action]
+                        return _path_to_node(problem, actions), expanded, tested
+                    buffer.append(encoder.packState(child) + parent + _ACTION.pack(action))
+                    tested += 1
+
+                    if len(buffer) >= max_records:
+                        runs.append(_write_run(scratch, len(layers), len(runs), buffer, state_size))
+                        buffer = []
+
+                if test_limit != None and tested > test_limit:
+                    return None
+
+                if endpoint != None:
+                    message = endpoint.receive()
+                    if message != None and "continue" in message:
+                        run = message["continue"]
+                    if not run:
+                        return None
+
+            if buffer:
+                runs.append(_write_run(scratch, len(layers), len(runs), buffer, state_size))
+                buffer = []
+
+            layer = os.path.join(scratch, "layer_" + str(len(layers)))
+            previous = layers[-2:] if reversible else layers
+            count = _merge_runs(runs, previous, layer, state_size, record_size)
+            for filename in runs:
+                os.remove(filename)
+
+            if count == 0:
+                # nessuno stato nuovo: il goal non è raggiungibile
+                return None
+            layers.append(layer)
+
+    return None
+
+
+def _read_records(filename, record_size):
+    '''
+        Legge in sequenza i record di un file a blocchi di ``_READ_RECORDS`` record
+    '''
+    with open(filename, "rb") as infile:
+        while True:
+            data = infile.read(record_size * _READ_RECORDS)
+            if not data:
+                return
+            for i in range(0, len(data), record_size):
+                yield data[i:i + record_size]
+
+
+def _write_run(scratch, layer_index, run_index, buffer, state_size):
+    '''
+        Ordina i record in memoria, elimina gli stati ripetuti e li scrive in un file temporaneo
+    '''
+    buffer.sort()
+    filename = os.path.join(scratch, "run_{}_{}".format(layer_index, run_index))
+    with open(filename, "wb") as outfile:
+        last = None
+        for record in buffer:
+            state = record[:state_size]
+            if state != last:
+                outfile.write(record)
+                last = state
+    return filename
+
+
+def _merge_runs(runs, previous, filename, state_size, record_size):
+    '''
+        Unisce i file temporanei di un livello nel file ordinato ``filename``, scartando
+        gli stati ripetuti e quelli presenti nei file dei livelli ``previous``.
+        Restituisce il numero di stati scritti.
+    '''
+    merged = heapq.merge(*[_read_records(run, record_size) for run in runs])
+
+    # per ogni livello precedente, iteratore sugli stati e stato corrente
+    cursors = []
+    for layer in previous:
+        states = (record[:state_size] for record in _read_records(layer, record_size))
+        cursors.append([states, next(states, None)])
+
+    count = 0
+    last = None
+    with open(filename, "wb") as outfile:
+        for record in merged:
+            state = record[:state_size]
+            if state == last:
+                continue
+            last = state
+
+            duplicate = False
+            for cursor in cursors:
+                while cursor[1] != None and cursor[1] < state:
+                    cursor[1] = next(cursor[0], None)
+                if cursor[1] == state:
+                    duplicate = True
+                    break
+
+            if not duplicate:
+                outfile.write(record)
+                count += 1
+    return count
+
+
+def _find_record(filename, state, state_size, record_size):
+    '''
+        Ricerca binaria del record di uno stato in un file di livello
+    '''
+    with open(filename, "rb") as infile:
+        low, high = 0, os.path.getsize(filename) // record_size
+        while low < high:
+            middle = (low + high) // 2
+            infile.seek(middle * record_size)
+            record = infile.read(record_size)
+            if record[:state_size] < state:
+                low = middle + 1
+            elif record[:state_size] > state:
+                high = middle
+            else:
+                return record
+    return None
+
+
+def _trace_actions(layers, state, state_size, record_size):
+    '''
+        Ricostruisce la sequenza di azioni che porta dallo stato iniziale
+        allo stato ``state`` dell'ultimo livello, risalendo i livelli a ritroso.
+    '''
+    actions = []
+    for layer in reversed(layers[1:]):
+        record = _find_record(layer, state, state_size, record_size)
+        state = record[state_size:2 * state_size]
+        actions.append(_ACTION.unpack(record[2 * state_size:])[0])
+    actions.reverse()
+    return actions
+
+
+def _path_to_node(problem, actions):
+    '''
+        Costruisce la catena di nodi ottenuta applicando in ordine le azioni allo stato iniziale
+    '''
+    node = Node(problem.initial)
+    for action in actions:
+        state = problem.result(node.state, action)
+        node = Node(state, node, action, problem.path_cost(node.path_cost, node.state, action, state))
+    return node
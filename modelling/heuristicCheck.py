@@ -0,0 +1,202 @@
+"""
+Verifica delle euristiche dei problemi Block World.
+
+Per ogni modello di una cartella (di default ``sample_models``) vengono formulati il
+problema basato sui colori ed un problema con stato goal, ottenuto con alcune mosse casuali.
+Ogni problema viene risolto in modo ottimo con una ricerca in ampiezza: gli stati del
+percorso trovato hanno quindi distanza dal goal nota, a cui si aggiungono alcuni stati
+vicini la cui distanza viene calcolata con una nuova ricerca.
+
+Su questi stati ogni euristica del problema (vedi ``HEURISTICS``) viene confrontata con
+la distanza reale (ammissibilità) e con i valori dei successori (consistenza); infine
+il problema viene risolto con A* per confrontare nodi espansi e lunghezza della soluzione.
+
+Utilizzo:
+
+    python -m modelling.heuristicCheck [--models sample_models] [--samples 20] [--seed 0]
+"""
+
+import argparse
+import copy
+import os
+import random
+
+from modelling.model import BlockWorldModel
+from modelling.problem import BlockWorldProblem, ColorBasedBlockWorldProblem
+from modelling.stateSpaceSearch import Node, astar_search, bidirectional_breadth_first_search, breadth_first_graph_search
+
+
+def random_goal(model, moves, seed = None):
+    '''
+        Restituisce la disposizione ottenuta spostando ``moves`` volte
+        un blocco in cima ad una pila sopra ad un'altra pila scelta a caso.
+    '''
+    rnd = random.Random(seed)
+    goal = [list(stack) for stack in model]
+    for _ in range(moves):
+        src = rnd.choice([i for i, stack in enumerate(goal) if len(stack) > 0])
+        dst = rnd.choice([i for i in range(len(goal)) if i != src])
+        goal[dst].append(goal[src].pop())
+    return goal
+
+
+def optimal_search(problem, test_limit = None):
+    '''
+        Ricerca ottima che non utilizza l'euristica: bidirezionale se lo stato goal è noto.
+    '''
+    if isinstance(problem, BlockWorldProblem):
+        return bidirectional_breadth_first_search(problem, test_limit = test_limit)
+    return breadth_first_graph_search(problem, test_limit = test_limit)
+
+
+def true_distance(problem, state, test_limit = None):
+    '''
+        Distanza reale di uno stato dal goal. Restituisce None se la ricerca
+        supera ``test_limit`` oppure se il goal non è raggiungibile.
+    '''
+    sub_problem = copy.copy(problem)
+    sub_problem.initial = state
+    result = optimal_search(sub_problem, test_limit)
+    return result[0].path_cost if result != None else None
+
+
+def collect_samples(problem, n_samples = 20, seed = None, test_limit = 200000):
+    '''
+        Raccoglie stati con distanza dal goal nota.
+
+        Valori restituiti:
+
+            Coppia formata dal costo della soluzione ottima e dalla lista di coppie
+            (stato, distanza); None se il problema non è stato risolto.
+    '''
+    result = optimal_search(problem, test_limit)
+    if result == None:
+        return None
+
+    rnd = random.Random(seed)
+    path = result[0].path()
+    cost = result[0].path_cost
+    samples = [(node.state, cost - node.path_cost) for node in path]
+
+    # stati vicini a quelli del percorso ottimo
+    attempts = 0
+    while len(samples) < len(path) + n_samples and attempts < 4 * n_samples:
+        attempts += 1
+        state = rnd.choice(path).state
+        for _ in range(rnd.randint(1, 4)):
+            actions = problem.actions(state)
+            if len(actions) == 0:
+                break
+            state = problem.result(state, rnd.choice(actions))
+        distance = true_distance(problem, state, test_limit)
+        if distance != None:
+            samples.append((state, distance))
+
+    return cost, samples
+
+
+def check_heuristic(problem, samples):
+    '''
+        Confronta l'euristica del problema con le distanze reali degli stati
+        campionati e con i valori dei loro successori.
+
+        Valori restituiti:
+
+            Dizionario con il numero di violazioni dell'ammissibilità (``admissibility``)
+            e della consistenza (``consistency``) e la massima sovrastima della distanza.
+    '''
+    report = {"admissibility": 0, "consistency": 0, "max_overestimate": 0}
+    for state, distance in samples:
+        h = problem.h(Node(state))
+        if h > distance:
+            report["admissibility"] += 1
+            report["max_overestimate"] = max(report["max_overestimate"], h - distance)
+        for action in problem.actions(state):
+            child = problem.result(state, action)
+            if h > problem.path_cost(0, state, action, child) + problem.h(Node(child)):
+                report["consistency"] += 1
+    return report
+
+
+def compare_heuristics(make_problem, heuristics, n_samples = 20, seed = None, test_limit = 200000):
+    '''
+        Verifica tutte le euristiche di un problema.
+
+        Parametri:
+
+            make_problem : function
+                Funzione che, dato il nome di una euristica, restituisce
+                il problema che la utilizza
+
+            heuristics : dict
+                Dizionario delle euristiche del problema (``HEURISTICS``)
+
+        Valori restituiti:
+
+            Dizionario che associa al nome di ogni euristica il risultato di ``check_heuristic``,
+            a cui si aggiungono le proprietà dichiarate (``declared``), i nodi espansi da A*
+            (``expanded``) e l'ottimalità della soluzione trovata (``optimal``).
+            None se il problema non è stato risolto.
+    '''
+    collected = collect_samples(make_problem("Blind"), n_samples, seed, test_limit)
+    if collected == None:
+        return None
+    cost, samples = collected
+
+    reports = {}
+    for name, (_, admissible, consistent) in heuristics.items():
+        problem = make_problem(name)
+        report = check_heuristic(problem, samples)
+        report["samples"] = len(samples)
+        report["declared"] = (admissible, consistent)
+        result = astar_search(problem, test_limit = test_limit)
+        # espansi ed ottimalità sono None se A* supera il limite di test
+        report["expanded"] = result[1] if result != None else None
+        report["optimal"] = result[0].path_cost == cost if result != None else None
+        reports[name] = report
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica delle euristiche dei problemi Block World")
+    parser.add_argument("--models", default="sample_models", help="cartella dei modelli")
+    parser.add_argument("--samples", type=int, default=20, help="stati vicini al percorso ottimo da campionare")
+    parser.add_argument("--goal-moves", type=int, default=6, help="mosse casuali per generare lo stato goal")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    problem_types = [
+        ("colori", ColorBasedBlockWorldProblem.HEURISTICS,
+         lambda model, goal: lambda name: ColorBasedBlockWorldProblem(model, heuristic = name)),
+        ("goal", BlockWorldProblem.HEURISTICS,
+         lambda model, goal: lambda name: BlockWorldProblem(model, goal, heuristic = name))
+    ]
+
+    violations = 0
+    for filename in sorted(os.listdir(args.models)):
+        if not filename.endswith(".json"):
+            continue
+        model = BlockWorldModel.loadFromFile(os.path.join(args.models, filename))
+        goal = random_goal(model, args.goal_moves, args.seed)
+
+        for kind, heuristics, factory in problem_types:
+            reports = compare_heuristics(factory(model, goal), heuristics, args.samples, args.seed)
+            if reports == None:
+                print("{} ({}): non risolto".format(filename, kind))
+                continue
+            for name, r in reports.items():
+                admissible, consistent = r["declared"]
+                # solo le proprietà dichiarate e non rispettate sono errori
+                wrong = (admissible and r["admissibility"] > 0) or (consistent and r["consistency"] > 0)
+                violations += wrong
+                search = "limite di test superato" if r["expanded"] == None \
+                         else "espansi {}, ottima {}".format(r["expanded"], r["optimal"])
+                print("{} ({}) {}: campioni {}, non ammissibile {} (max +{}), non consistente {}, {}{}".format(
+                      filename, kind, name, r["samples"], r["admissibility"], r["max_overestimate"],
+                      r["consistency"], search, " <- PROPRIETÀ DICHIARATE VIOLATE" if wrong else ""))
+
+    return 1 if violations > 0 else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
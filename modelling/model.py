@@ -277,6 +277,10 @@ class BlockWorldModel():
         '''
             Rimuove un blocco da un modello.
 
+            Il nuovo modello condivide con quello di partenza tutte le pile non modificate
+            ed i blocchi non vengono copiati, per cui il costo dell'operazione dipende solo
+            dall'altezza della pila coinvolta.
+
             Parametri:
                 model : tuple
                     Modello
@@ -291,20 +295,10 @@ class BlockWorldModel():
 
                 La funzione restituisce una coppia formata dal nuovo modello e dal blocco rimosso.
         '''
-        new_model = list()
-        toReturn = None
-
-        for i,stack in enumerate(model):
-
-            new_stack = list()
-            for j,block in enumerate(stack):
-                b_copy = block.copy()
-                if i != stack_index or j != block_index:
-                    new_stack.append(b_copy)
-                else :
-                    toReturn = b_copy
-
-            new_model.append(tuple(new_stack))
+        new_model = BlockWorldModel.shallowCopy(model)
+        stack = new_model[stack_index]
+        toReturn = stack[block_index]
+        new_model[stack_index] = stack[:block_index] + stack[block_index + 1:]
 
         return tuple(new_model), toReturn
 
@@ -315,11 +309,15 @@ class BlockWorldModel():
             Il nuovo blocco viene aggiunto in cima allo stack corrispondente
             al dato indice.
 
+            Il nuovo modello condivide con quello di partenza tutte le pile non modificate
+            ed i blocchi non vengono copiati, per cui il costo dell'operazione dipende solo
+            dall'altezza della pila coinvolta.
+
             Parametri:
                 model : tuple
                     Modello
                 
-                block : Block 
+                block : object 
                     Blocco da aggiungere
                 
                 stack_index : int
@@ -329,22 +327,18 @@ class BlockWorldModel():
             
                 La funzione restituisce una tupla che rappresenta il nuovo modello con il blocco aggiunto.
         '''
-        new_model = list()
+        new_model = BlockWorldModel.shallowCopy(model)
+        new_model[stack_index] = new_model[stack_index] + (block,)
 
-        for i,stack in enumerate(model):
-            new_stack = list()
-            # prima copia l'intera pila
-            for b in stack:
-                b_copy = b.copy()
-                new_stack.append(b_copy)
-            # se la pila corrente corrisponde a quella data ...
-            if i == stack_index:
-                # ... aggiunge il nuovo blocco in cima alla pila
-                new_stack.append(block.copy())
+        return tuple(new_model)
 
-            new_model.append(tuple(new_stack))
 
-        return tuple(new_model)
+    def shallowCopy(model):
+        '''
+            Restituisce una lista contenente le pile del modello.
+            Le pile già in forma di tupla vengono condivise con il modello originale.
+        '''
+        return [stack if isinstance(stack, tuple) else tuple(stack) for stack in model]
 
 
     # # restituisce un NUOVO STATO con un nuovo stack composto dal blocco specificato
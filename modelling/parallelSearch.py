@@ -0,0 +1,404 @@
+"""
+Algoritmi di ricerca nello spazio degli stati eseguiti in parallelo su più processi.
+
+Gli stati vengono scambiati tra i processi, per cui il loro hash deve essere lo stesso
+in ogni processo: è il caso degli stati codificati dei problemi Block World
+(vedi ``modelling.encoding.EncodedState``).
+"""
+
+import heapq
+import itertools
+import multiprocessing
+import os
+import queue
+import time
+
+from modelling.stateSpaceSearch import Node
+
+# ______________________________________________________________________________
+# Hash Distributed A*
+
+
+def hash_distributed_astar_search(problem, endpoint = None, h = None, test_limit = None,
+                                  n_workers = None, batch_size = 64, telemetry = None, reply_timeout = 10):
+    '''
+        A* distribuito su più processi (HDA*).
+
+        Ogni stato appartiene al processo individuato dal suo hash: ogni processo gestisce
+        la parte della frontiera e degli stati esplorati che gli appartiene, ed invia i
+        successori generati ai rispettivi proprietari in blocchi di messaggi.
+        Il primo goal trovato fissa un limite superiore al costo della soluzione:
+        la ricerca termina quando nessun processo ha più nodi con f inferiore a tale limite
+        e non ci sono più messaggi in transito, per cui la soluzione restituita è ottima
+        se l'euristica è ammissibile. Se la ricerca viene arrestata (o raggiunge il limite
+        di nodi testati) dopo aver trovato un goal, viene restituita la migliore soluzione
+        trovata con l'indicazione che non è garantita ottima.
+
+        Parametri:
+
+            n_workers : int
+                Numero di processi (di default il numero di core della macchina)
+
+            batch_size : int
+                Numero massimo di nodi espansi da un processo prima di inviare
+                i successori generati agli altri processi
+
+            telemetry : SearchTelemetry
+                Riceve i campioni raccolti dal coordinatore (somma dei contatori
+                comunicati dai processi ad ogni giro di controllo)
+
+            reply_timeout : float
+                Secondi di attesa della risposta di un processo durante la ricostruzione
+                del percorso, trascorsi i quali la ricerca fallisce se un processo è terminato
+    '''
+    h = h or problem.h
+    n_workers = n_workers or os.cpu_count() or 1
+
+    context = multiprocessing.get_context()
+    inboxes = [context.Queue() for _ in range(n_workers)]
+    reports = context.Queue()
+    stop = context.Event()
+    incumbent = context.Value('d', float('inf'))
+
+    workers = [context.Process(target=_hda_worker,
+                               args=(i, problem, h, inboxes, reports, stop, incumbent, batch_size),
+                               daemon=True)
+               for i in range(n_workers)]
+
+    if endpoint != None:
+        message = endpoint.receive()
+        if message != None and "continue" in message:
+            run = message["continue"]
+        else: run = True
+    else: run = True
+
+    try:
+        for worker in workers:
+            worker.start()
+
+        # il coordinatore invia lo stato iniziale al suo proprietario
+        inboxes[hash(problem.initial) % n_workers].put(("nodes", [(problem.initial, 0, None, None)]))
+
+        status = {}
+        solution = None
+        probe_round = 0
+        probe_replies = None
+        probe_time = 0
+        previous_totals = None
+        terminated = False
+
+        while run and not terminated:
+
+            try:
+                message = reports.get(timeout=0.05)
+            except queue.Empty:
+                message = None
+
+            if not all(worker.is_alive() for worker in workers):
+                # un processo è terminato inaspettatamente: la ricerca non può proseguire
+                return None
+
+            if message != None:
+                if message[0] == "solution":
+                    if solution == None or message[1] < solution[0]:
+                        solution = (message[1], message[2])
+                elif message[0] == "status":
+                    status[message[1]] = message[2:]
+                    if probe_replies != None and message[-1] == probe_round:
+                        probe_replies[message[1]] = message[2:]
+
+            tested = sum(s[3] for s in status.values())
+            if test_limit != None and tested > test_limit:
+                break
+
+            if probe_replies != None and len(probe_replies) == n_workers:
+                # fine di un giro di controllo: la ricerca è terminata se tutti i processi
+                # sono inattivi, ogni messaggio inviato è stato ricevuto e nulla è cambiato
+                # rispetto al giro precedente
+                idle = all(r[0] for r in probe_replies.values())
+                totals = (sum(r[1] for r in probe_replies.values()) + 1,
+                          sum(r[2] for r in probe_replies.values()))
+                if idle and totals[0] == totals[1]:
+                    terminated = totals == previous_totals
+                    previous_totals = totals
+                else:
+                    previous_totals = None
+                probe_replies = None
+
+            if probe_replies == None and not terminated and time.time() - probe_time > 0.02:
+                probe_round += 1
+                probe_replies = {}
+                probe_time = time.time()
+                for inbox in inboxes:
+                    inbox.put(("probe", probe_round))
+
+            if endpoint != None:
+                message = endpoint.receive()
+                if message != None and "continue" in message:
+                    run = message["continue"]
+
+            # il coordinatore esegue poche iterazioni al secondo,
+            # per cui il tempo trascorso viene controllato ad ogni iterazione
+            if telemetry != None and time.time() - telemetry.last_time >= telemetry.interval:
+                telemetry.publish(sum(s[4] for s in status.values()), tested,
+                                  sum(s[5] for s in status.values()), sum(s[6] for s in status.values()),
+                                  bound = solution[0] if solution != None else None)
+
+        if solution == None:
+            return None
+
+        # ricostruisce il percorso chiedendo ad ogni proprietario il padre di ogni stato
+        steps = []
+        state = solution[1]
+        while True:
+            inboxes[hash(state) % n_workers].put(("trace", state))
+            message = _next_parent_message(reports, workers, reply_timeout)
+            if message == None:
+                return None
+            parent, action = message[2], message[3]
+            if parent == None:
+                break
+            steps.append((action, state))
+            state = parent
+
+        node = _path_to_node(problem, state, reversed(steps))
+
+        expanded = sum(s[4] for s in status.values())
+        tested = sum(s[3] for s in status.values())
+        if not terminated:
+            # ricerca interrotta: potrebbe esistere una soluzione migliore
+            return node, expanded, tested, {"optimal": False}
+        return node, expanded, tested
+
+    finally:
+        stop.set()
+        for worker in workers:
+            if worker.is_alive():
+                worker.join(timeout=1)
+            if worker.is_alive():
+                worker.terminate()
+        for inbox in inboxes:
+            inbox.cancel_join_thread()
+
+
+def _hda_worker(index, problem, h, inboxes, reports, stop, incumbent, batch_size):
+    '''
+        Processo di HDA*: gestisce gli stati il cui hash corrisponde all'indice ``index``.
+    '''
+    n_workers = len(inboxes)
+    inbox = inboxes[index]
+    for q in itertools.chain(inboxes, [reports]):
+        q.cancel_join_thread()
+
+    counter = itertools.count()
+    open_list = []      # heap di tuple (f, h, ordine, g, stato)
+    best_g = {}         # stato -> costo minimo trovato
+    parents = {}        # stato -> (stato padre, azione)
+    outboxes = [[] for _ in range(n_workers)]
+    sent = received = tested = expanded = 0
+
+    def insert(state, g, parent, action):
+        if g < best_g.get(state, float('inf')):
+            best_g[state] = g
+            parents[state] = (parent, action)
+            h_value = h(Node(state))
+            # a parità di f e di h si preferiscono i nodi generati per ultimi
+            heapq.heappush(open_list, (g + h_value, h_value, -next(counter), g, state))
+
+    def is_idle():
+        return len(open_list) == 0 or open_list[0][0] >= incumbent.value
+
+    while not stop.is_set():
+
+        # gestisce i messaggi ricevuti, attendendo solo se non c'è lavoro da fare
+        block = is_idle()
+        while True:
+            try:
+                message = inbox.get(timeout=0.01) if block else inbox.get_nowait()
+            except queue.Empty:
+                break
+            block = False
+
+            if message[0] == "nodes":
+                received += len(message[1])
+                for state, g, parent, action in message[1]:
+                    insert(state, g, parent, action)
+            elif message[0] == "probe":
+                reports.put(("status", index, is_idle(), sent, received, tested, expanded,
+                             len(open_list), len(best_g), message[1]))
+            elif message[0] == "trace":
+                parent, action = parents.get(message[1], (None, None))
+                reports.put(("parent", message[1], parent, action))
+
+        # espande al massimo batch_size nodi
+        for _ in range(batch_size):
+            if is_idle():
+                break
+            _, _, _, g, state = heapq.heappop(open_list)
+            if g > best_g[state]:
+                # esiste già un percorso migliore per questo stato
+                continue
+
+            tested += 1
+            if problem.goal_test(state):
+                with incumbent.get_lock():
+                    if g < incumbent.value:
+                        incumbent.value = g
+                        reports.put(("solution", g, state))
+                continue
+
+            for action in problem.actions(state):
+                child = problem.result(state, action)
+                child_g = problem.path_cost(g, state, action, child)
+                expanded += 1
+                owner = hash(child) % n_workers
+                if owner == index:
+                    insert(child, child_g, state, action)
+                else:
+                    outboxes[owner].append((child, child_g, state, action))
+
+        # invia i successori ai rispettivi proprietari
+        for owner, batch in enumerate(outboxes):
+            if batch:
+                inboxes[owner].put(("nodes", batch))
+                sent += len(batch)
+                outboxes[owner] = []
+
+
+def _next_parent_message(reports, workers, timeout):
+    '''
+        Attende la risposta ad una richiesta "trace", ignorando gli altri messaggi.
+        Restituisce None se la risposta non arriva entro ``timeout`` secondi
+        ed uno dei processi è terminato.
+    '''
+    while True:
+        try:
+            message = reports.get(timeout=timeout)
+        except queue.Empty:
+            if not all(worker.is_alive() for worker in workers):
+                return None
+            continue
+        if message[0] == "parent":
+            return message
+
+
+def _path_to_node(problem, initial, steps):
+    '''
+        Costruisce la catena di nodi che parte dallo stato ``initial``
+        ed applica in ordine le coppie (azione, stato) di ``steps``.
+    '''
+    node = Node(initial)
+    for action, state in steps:
+        node = Node(state, node, action, problem.path_cost(node.path_cost, node.state, action, state))
+    return node
+
+# ______________________________________________________________________________
+# Breadth First Search parallela
+
+
+def parallel_breadth_first_search(problem, endpoint = None, test_limit = None,
+                                  n_workers = None, chunk_size = 512):
+    '''
+        Ricerca in ampiezza sincronizzata per livelli.
+
+        Ogni livello della ricerca viene suddiviso in blocchi di ``chunk_size`` stati che
+        vengono espansi in parallelo dai processi di un pool; i successori vengono poi
+        uniti nel livello successivo scartando gli stati già raggiunti. La ricerca si
+        arresta non appena un processo trova uno stato goal.
+
+        Conteggi e percorso restituiti hanno lo stesso significato di quelli
+        di ``breadth_first_graph_search``.
+    '''
+    tested = 0
+    expanded = 0
+
+    if problem.goal_test(problem.initial):
+        return Node(problem.initial), 1, 0
+
+    n_workers = n_workers or os.cpu_count() or 1
+
+    if endpoint != None:
+        message = endpoint.receive()
+        if message != None and "continue" in message:
+            run = message["continue"]
+        else: run = True
+    else: run = True
+
+    parents = {problem.initial: (None, None)}
+    layer = [problem.initial]
+
+    def path_to(state):
+        steps = []
+        while parents[state][0] != None:
+            parent, action = parents[state]
+            steps.append((action, state))
+            state = parent
+        return _path_to_node(problem, problem.initial, reversed(steps))
+
+    with multiprocessing.get_context().Pool(n_workers, initializer=_init_bfs_worker, initargs=(problem,)) as pool:
+
+        while layer and run:
+
+            if len(layer) <= chunk_size:
+                # i livelli piccoli vengono espansi direttamente
+                results = [_expand_states(problem, layer)]
+            else:
+                chunks = [layer[i:i + chunk_size] for i in range(0, len(layer), chunk_size)]
+                results = pool.imap_unordered(_expand_chunk, chunks)
+
+            next_layer = []
+            for successors in results:
+
+                for child, parent, action, is_goal in successors:
+                    if child in parents:
+                        continue
+                    parents[child] = (parent, action)
+                    expanded += 1
+                    if is_goal:
+                        return path_to(child), expanded, tested
+                    next_layer.append(child)
+                    tested += 1
+
+                if test_limit != None and tested > test_limit:
+                    return None
+
+                if endpoint != None:
+                    message = endpoint.receive()
+                    if message != None and "continue" in message:
+                        run = message["continue"]
+                    if not run:
+                        return None
+
+            layer = next_layer
+
+    return None
+
+
+_bfs_problem = None
+
+def _init_bfs_worker(problem):
+    global _bfs_problem
+    _bfs_problem = problem
+
+def _expand_chunk(states):
+    return _expand_states(_bfs_problem, states)
+
+def _expand_states(problem, states):
+    '''
+        Espande un blocco di stati. Restituisce la lista dei successori non ripetuti
+        sotto forma di tuple (stato, stato padre, azione, goal raggiunto).
+    '''
+    seen = set()
+    successors = []
+    for state in states:
+        for action in problem.actions(state):
+            child = problem.result(state, action)
+            if child in seen:
+                continue
+            seen.add(child)
+            is_goal = problem.goal_test(child)
+            successors.append((child, state, action, is_goal))
+            if is_goal:
+                # il goal viene comunicato subito al processo principale
+                return successors
+    return successors
@@ -0,0 +1,182 @@
+"""
+Database di pattern per il problema Block World.
+
+Un pattern è un sottoinsieme dei blocchi del problema: proiettando uno stato sul pattern
+si ignorano tutti gli altri blocchi, ottenendo un problema astratto abbastanza piccolo
+da poter calcolare, con una ricerca in ampiezza a ritroso dallo stato goal, la distanza
+esatta dal goal di ogni suo stato. Ogni azione del problema sposta un solo blocco, per cui
+la distanza astratta non supera il numero di azioni che coinvolgono i blocchi del pattern:
+le distanze di pattern disgiunti possono quindi essere sommate ottenendo
+un'euristica ammissibile e consistente.
+
+I database dipendono solo dallo stato goal, per cui vengono salvati su disco e
+riutilizzati ogni volta che si risolve un problema con la stessa disposizione finale.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from collections import deque
+
+PDB_CACHE_DIR = "settings/pdb_cache"
+
+class PatternDatabase():
+    '''
+        Euristica basata su database di pattern per ``BlockWorldProblem``.
+
+        I blocchi vengono suddivisi in pattern di ``pattern_size`` blocchi, raggruppando
+        i blocchi di una stessa pila goal dal basso verso l'alto. Il valore dell'euristica
+        è la somma (``combine = "add"``) oppure il massimo (``combine = "max"``)
+        delle distanze astratte dei singoli pattern.
+
+        Parametri:
+
+            problem : BlockWorldProblem
+                Problema per il quale costruire i database
+
+            pattern_size : int
+                Numero massimo di blocchi di un pattern. Il numero di stati astratti
+                cresce rapidamente con questo valore e con il numero di pile del modello
+
+            combine : str
+                Modalità di combinazione dei valori dei pattern ("add" o "max")
+
+            cache_dir : str
+                Cartella nella quale salvare i database (None per non salvarli)
+    '''
+
+    def __init__(self, problem, pattern_size = 4, combine = "add", cache_dir = PDB_CACHE_DIR) -> None:
+        if combine not in ("add", "max"):
+            raise ValueError("Modalità di combinazione non valida: " + str(combine))
+
+        self.combine = combine
+        self.patterns = PatternDatabase.partition(problem.goal, pattern_size)
+
+        self.pattern_of = [None] * len(problem.encoder)
+        for p, pattern in enumerate(self.patterns):
+            for block in pattern:
+                self.pattern_of[block] = p
+
+        filename = None
+        if cache_dir != None:
+            filename = os.path.join(cache_dir, PatternDatabase.cache_key(problem, pattern_size) + ".pdb")
+
+        self.tables = PatternDatabase.load(filename, self.patterns)
+        if self.tables == None:
+            self.tables = [PatternDatabase.build_table(problem.goal, set(pattern)) for pattern in self.patterns]
+            PatternDatabase.save(filename, self.patterns, self.tables)
+
+    def __call__(self, node):
+        return self.value(node.state)
+
+    def value(self, state):
+        '''
+            Restituisce il valore dell'euristica per uno stato codificato
+        '''
+        values = []
+        for p, table in enumerate(self.tables):
+            model = tuple(tuple(b for b in stack if self.pattern_of[b] == p) for stack in state.model)
+            hand = state.hand if state.hand != None and self.pattern_of[state.hand] == p else None
+            values.append(table[(model, hand)])
+
+        if len(values) == 0:
+            return 0
+        return sum(values) if self.combine == "add" else max(values)
+
+    def partition(goal, pattern_size):
+        '''
+            Suddivide i blocchi dello stato goal in pattern disgiunti.
+            I blocchi vengono presi pila per pila, dal basso verso l'alto,
+            per cui ogni pattern contiene per quanto possibile blocchi adiacenti.
+            Blocchi con lo stesso identificativo hanno lo stesso codice
+            e vengono quindi assegnati allo stesso pattern.
+        '''
+        blocks = [block for stack in goal.model for block in stack]
+        if goal.hand != None:
+            blocks.append(goal.hand)
+        blocks = list(dict.fromkeys(blocks))
+        return [tuple(blocks[i:i + pattern_size]) for i in range(0, len(blocks), pattern_size)]
+
+    def build_table(goal, pattern):
+        '''
+            Calcola la distanza dal goal di ogni stato del problema proiettato su ``pattern``.
+
+            Le azioni del problema sono reversibili, per cui la ricerca in ampiezza
+            che parte dallo stato goal astratto trova le distanze dal goal.
+            Uno stato astratto è una coppia (m, h) come quelli del problema,
+            in cui compaiono solo i blocchi del pattern.
+
+            Valori restituiti:
+
+                Dizionario che associa ad ogni stato astratto la sua distanza dal goal.
+        '''
+        start = (tuple(tuple(b for b in stack if b in pattern) for stack in goal.model),
+                 goal.hand if goal.hand in pattern else None)
+        distance = {start: 0}
+        frontier = deque([start])
+
+        while frontier:
+            state = frontier.popleft()
+            model, hand = state
+            d = distance[state] + 1
+
+            for i, stack in enumerate(model):
+                if hand == None:
+                    if len(stack) == 0:
+                        continue
+                    child = (model[:i] + (stack[:-1],) + model[i + 1:], stack[-1])
+                else:
+                    child = (model[:i] + (stack + (hand,),) + model[i + 1:], None)
+
+                if child not in distance:
+                    distance[child] = d
+                    frontier.append(child)
+
+        return distance
+
+    def cache_key(problem, pattern_size):
+        '''
+            Chiave che identifica i database di uno stato goal: dipende dalla disposizione
+            degli identificativi dei blocchi nello stato goal e dalla dimensione dei pattern.
+        '''
+        model, hand = problem.encoder.decodeState(problem.goal)
+        layout = {
+            "model": [[block.id for block in stack] for stack in model],
+            "hand": hand.id if hand != None else None,
+            "pattern_size": pattern_size
+        }
+        return hashlib.sha1(json.dumps(layout, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def load(filename, patterns):
+        '''
+            Carica i database da file.
+            Restituisce None se il file non esiste, non è leggibile o contiene pattern diversi.
+        '''
+        if filename == None or not os.path.isfile(filename):
+            return None
+        try:
+            with open(filename, "rb") as infile:
+                stored_patterns, tables = pickle.load(infile)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            return None
+        if stored_patterns != patterns:
+            return None
+        return tables
+
+    def save(filename, patterns, tables):
+        '''
+            Salva i database su file. Eventuali errori di scrittura vengono ignorati:
+            i database verranno semplicemente ricalcolati alla prossima esecuzione.
+        '''
+        if filename == None:
+            return
+        try:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            # il file viene scritto con un nome temporaneo e poi rinominato,
+            # per non lasciare file incompleti in caso di interruzione
+            with open(filename + ".tmp", "wb") as outfile:
+                pickle.dump((patterns, tables), outfile, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(filename + ".tmp", filename)
+        except OSError:
+            pass
@@ -0,0 +1,153 @@
+"""
+Cache su disco dei piani trovati.
+
+Ogni piano viene salvato in un database SQLite con una chiave che identifica
+la ricerca che lo ha prodotto: tipo di problema, blocchi, stato iniziale, stato goal,
+euristica, algoritmo ed eventuali opzioni che ne modificano il risultato
+(vedi ``problem_fingerprint``). Risolvere di nuovo lo stesso problema con lo stesso
+algoritmo restituisce quindi subito il piano salvato, insieme alle statistiche
+della ricerca originale.
+
+Il piano è salvato come sequenza di azioni codificate e viene ricostruito
+applicandole allo stato iniziale. Quando il numero di piani o la loro dimensione
+complessiva superano i limiti, vengono eliminati i piani usati meno di recente.
+"""
+
+import contextlib
+import json
+import os
+import sqlite3
+import time
+
+from modelling.checkpoint import problem_fingerprint
+from modelling.stateSpaceSearch import Node
+
+PLAN_CACHE_FILE = "settings/plan_cache.sqlite"
+
+class PlanCache():
+    '''
+        Cache dei piani.
+
+        Parametri:
+
+            filename : str
+                File del database (viene creato se non esiste)
+
+            max_entries : int
+                Numero massimo di piani salvati
+
+            max_bytes : int
+                Dimensione massima complessiva dei piani salvati
+    '''
+
+    def __init__(self, filename = PLAN_CACHE_FILE, max_entries = 1000, max_bytes = 16 * 2**20) -> None:
+        self.filename = filename
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def key(self, problem, algorithm, options = None):
+        '''
+            Chiave di un piano: dipende dal problema, dall'algoritmo e dalle opzioni della ricerca
+        '''
+        search = [algorithm, sorted((options or {}).items())]
+        return problem_fingerprint(problem, repr(search))
+
+    def get(self, key, problem):
+        '''
+            Cerca il piano associato a ``key``.
+
+            Valori restituiti:
+
+                Coppia formata dal nodo finale del piano (ricostruito applicando le azioni
+                allo stato iniziale di ``problem``) e dal dizionario delle statistiche salvate;
+                None se il piano non è presente o non porta ad uno stato goal.
+        '''
+        try:
+            with self._connect() as db:
+                row = db.execute("SELECT actions, info FROM plans WHERE key = ?", (key,)).fetchone()
+                if row == None:
+                    return None
+                db.execute("UPDATE plans SET last_used = ? WHERE key = ?", (time.time(), key))
+        except (sqlite3.Error, OSError):
+            return None
+
+        node = Node(problem.initial)
+        try:
+            for action in json.loads(row[0]):
+                if action not in problem.actions(node.state):
+                    raise ValueError(action)
+                node = node.child_node(problem, action)
+        except ValueError:
+            node = None
+        if node == None or not problem.goal_test(node.state):
+            # piano non più valido (ad esempio per una diversa codifica delle azioni)
+            self.remove(key)
+            return None
+        return node, json.loads(row[1])
+
+    def put(self, key, node, info):
+        '''
+            Salva il piano che termina nel nodo ``node`` insieme alle statistiche ``info``
+            (un dizionario serializzabile in JSON) ed elimina i piani usati meno di recente
+            se vengono superati i limiti della cache.
+        '''
+        actions = json.dumps(node.solution())
+        info = json.dumps(info)
+        try:
+            with self._connect() as db:
+                db.execute("INSERT OR REPLACE INTO plans (key, actions, info, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                           (key, actions, info, len(key) + len(actions) + len(info), time.time()))
+                self._evict(db)
+        except (sqlite3.Error, OSError):
+            pass
+
+    def remove(self, key):
+        try:
+            with self._connect() as db:
+                db.execute("DELETE FROM plans WHERE key = ?", (key,))
+        except (sqlite3.Error, OSError):
+            pass
+
+    def clear(self):
+        try:
+            with self._connect() as db:
+                db.execute("DELETE FROM plans")
+        except (sqlite3.Error, OSError):
+            pass
+
+    def __len__(self):
+        try:
+            with self._connect() as db:
+                return db.execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+        except (sqlite3.Error, OSError):
+            return 0
+
+    def _evict(self, db):
+        count, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM plans").fetchone()
+        if count <= self.max_entries and size <= self.max_bytes:
+            return
+        removed = []
+        for key, entry_size in db.execute("SELECT key, size FROM plans ORDER BY last_used"):
+            if count <= self.max_entries and size <= self.max_bytes:
+                break
+            removed.append((key,))
+            count -= 1
+            size -= entry_size
+        db.executemany("DELETE FROM plans WHERE key = ?", removed)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # una connessione per operazione, dato che la cache viene usata dal thread della ricerca;
+        # le modifiche vengono confermate al termine del blocco with
+        directory = os.path.dirname(self.filename)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.filename, timeout=10)
+        try:
+            with db:
+                db.execute("CREATE TABLE IF NOT EXISTS plans (key TEXT PRIMARY KEY, actions TEXT NOT NULL, "
+                           "info TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+                db.execute("CREATE INDEX IF NOT EXISTS plans_last_used ON plans (last_used)")
+                yield db
+        finally:
+            db.close()
@@ -0,0 +1,143 @@
+"""
+Ottimizzazione dei piani trovati.
+
+I piani trovati da algoritmi non ottimi (ricerca in profondità, A* pesato,
+pianificatore polinomiale, ...) contengono spesso azioni inutili: blocchi afferrati
+e riposati dove erano, oppure spostati più volte prima di raggiungere la posizione finale.
+Il piano viene accorciato in due passi:
+
+    1. vengono eliminati i cicli, cioè i tratti del piano che riportano
+       in uno stato già attraversato;
+
+    2. ogni finestra di ``window`` azioni consecutive viene risolta in modo ottimo
+       (ricerca in ampiezza, bidirezionale se le azioni del problema sono reversibili)
+       tra il suo primo ed il suo ultimo stato; se il tratto trovato è più breve
+       sostituisce quello del piano. L'ultima finestra può terminare
+       in un qualsiasi stato goal.
+
+Ogni ricerca è limitata a ``test_limit`` nodi testati, per cui il costo
+dell'ottimizzazione cresce linearmente con la lunghezza del piano.
+"""
+
+import copy
+
+from modelling.stateSpaceSearch import Node, Problem, bidirectional_breadth_first_search, breadth_first_graph_search
+
+
+class SegmentProblem(Problem):
+    '''
+        Tratto di un piano: stati ed azioni sono quelli di ``problem``,
+        ma il goal è lo stato ``goal``.
+    '''
+
+    def __init__(self, problem, initial, goal):
+        super().__init__(initial, goal)
+        self.problem = problem
+
+    def actions(self, state):
+        return self.problem.actions(state)
+
+    def result(self, state, action):
+        return self.problem.result(state, action)
+
+    def path_cost(self, c, state1, action, state2):
+        return self.problem.path_cost(c, state1, action, state2)
+
+    def inverse_action(self, state, action):
+        return self.problem.inverse_action(state, action)
+
+
+def optimize_plan(problem, node, window = 8, test_limit = 20000, endpoint = None):
+    '''
+        Accorcia il piano che termina nel nodo ``node``.
+
+        Parametri:
+
+            window : int
+                Numero di azioni di ogni finestra risolta in modo ottimo
+
+            test_limit : int
+                Numero massimo di nodi testati dalla ricerca di ogni finestra
+
+            endpoint : Endpoint
+                Se viene richiesto l'arresto, l'ottimizzazione termina
+                restituendo il piano migliorato fino a quel momento
+
+        Valori restituiti:
+
+            Nodo finale del piano ottimizzato (con lo stesso stato iniziale di ``node``).
+    '''
+    path = node.path()
+    states, actions = remove_cycles([n.state for n in path], [n.action for n in path[1:]])
+    reversible = type(problem).inverse_action is not Problem.inverse_action
+
+    i = 0
+    while i < len(actions) - 1:
+
+        if endpoint != None:
+            message = endpoint.receive()
+            if message != None and "continue" in message and not message["continue"]:
+                break
+
+        j = min(i + window, len(actions))
+        if j == len(actions):
+            # l'ultima finestra può terminare in un qualsiasi stato goal
+            segment_problem = copy.copy(problem)
+            segment_problem.initial = states[i]
+        else:
+            segment_problem = SegmentProblem(problem, states[i], states[j])
+
+        if reversible and segment_problem.goal != None:
+            result = bidirectional_breadth_first_search(segment_problem, test_limit = test_limit)
+        else:
+            result = breadth_first_graph_search(segment_problem, test_limit = test_limit)
+
+        segment = result[0].path() if result != None else None
+        if segment != None and len(segment) - 1 < j - i:
+            states = states[:i] + [n.state for n in segment] + states[j + 1:]
+            actions = actions[:i] + [n.action for n in segment[1:]] + actions[j:]
+            # le finestre precedenti che si sovrappongono al tratto sostituito
+            # potrebbero ora essere accorciate
+            i = max(0, i - window + 1)
+        else:
+            i += 1
+
+    node = Node(states[0])
+    for action in actions:
+        node = node.child_node(problem, action)
+    return node
+
+
+def remove_cycles(states, actions):
+    '''
+        Elimina dal piano i tratti che riportano in uno stato già attraversato.
+
+        Parametri:
+
+            states : list
+                Stati attraversati dal piano, dallo stato iniziale a quello finale
+
+            actions : list
+                Azioni del piano (``actions[k]`` porta da ``states[k]`` a ``states[k + 1]``)
+
+        Valori restituiti:
+
+            Coppia formata dagli stati e dalle azioni del piano senza cicli.
+    '''
+    position = {}
+    new_states = []
+    new_actions = []
+    for k, state in enumerate(states):
+        if state in position:
+            # si torna al punto del piano in cui lo stato era già stato raggiunto
+            p = position[state]
+            for removed in new_states[p + 1:]:
+                del position[removed]
+            del new_states[p + 1:]
+            del new_actions[p:]
+        else:
+            position[state] = len(new_states)
+            new_states.append(state)
+            if k > 0:
+                new_actions.append(actions[k - 1])
+    return new_states, new_actions
@@ -0,0 +1,270 @@
+"""
+Pianificatori specifici per il dominio Block World.
+
+A differenza degli algoritmi di ricerca, i pianificatori non esplorano lo spazio degli
+stati ma costruiscono direttamente il piano seguendo delle regole: il costo è polinomiale
+nel numero di blocchi, per cui possono essere utilizzati anche su modelli con centinaia
+di blocchi, ma il piano restituito in generale non è ottimo.
+
+Entrambi i pianificatori utilizzano le azioni codificate del problema, per cui il piano
+viene convertito negli oggetti ``Grab``, ``PutOn`` ed ``OnTable`` da ``decode_path``
+come quello di ogni altro algoritmo.
+"""
+
+from modelling.stateSpaceSearch import Node
+from modelling.problem import Action, BlockWorldProblem, ColorBasedBlockWorldProblem
+from modelling.encoding import encode_action
+
+
+def domain_specific_planner(problem, endpoint = None, test_limit = None):
+    '''
+        Sceglie il pianificatore adatto al tipo di problema.
+    '''
+    if isinstance(problem, ColorBasedBlockWorldProblem):
+        return color_grouping_planner(problem, endpoint, test_limit)
+    if isinstance(problem, BlockWorldProblem):
+        return block_world_planner(problem, endpoint, test_limit)
+    return None
+
+
+def _apply(problem, node, action):
+    '''
+        Applica una azione al nodo ``node`` e restituisce il nodo figlio
+    '''
+    state = problem.result(node.state, action)
+    return Node(state, node, action, problem.path_cost(node.path_cost, node.state, action, state))
+
+def _grab(problem, node, stack_index):
+    return _apply(problem, node, encode_action(Action.TYPE_GRAB, stack_index))
+
+def _put(problem, node, stack_index):
+    type = Action.TYPE_MOVE if len(node.state.model[stack_index]) > 0 else Action.TYPE_PUT
+    return _apply(problem, node, encode_action(type, stack_index))
+
+def _stopped(endpoint):
+    if endpoint != None:
+        message = endpoint.receive()
+        if message != None and "continue" in message:
+            return not message["continue"]
+    return False
+
+# ______________________________________________________________________________
+# Problema con stato goal
+
+
+def block_world_planner(problem, endpoint = None, test_limit = None):
+    '''
+        Pianificatore per ``BlockWorldProblem``.
+
+        Un blocco è al suo posto se la pila che lo contiene coincide, dal basso fino
+        al blocco stesso, con la pila corrispondente dello stato goal. I blocchi al loro
+        posto non vengono mai spostati: il piano viene costruito scegliendo ogni volta
+        la pila goal il cui prossimo blocco è più facile da raggiungere, liberando
+        quel blocco e la cima della pila goal, e posando il blocco sulla pila.
+
+        I blocchi da liberare vengono posati, in ordine di preferenza, direttamente
+        nella loro posizione finale se questa è pronta, sul tavolo (pile vuote anche
+        nello stato goal), sopra a pile che dovranno comunque essere smontate
+        ed infine sopra a pile già in costruzione.
+        Se il tavolo ha abbastanza posizioni libere ogni blocco fuori posto viene spostato
+        al massimo due volte, per cui il piano è lungo al massimo il doppio di quello ottimo;
+        in caso contrario il piano resta comunque lungo al più O(n^2) azioni.
+
+        Restituisce None se il problema richiede pile che il modello non ha.
+    '''
+    goal_model, goal_hand = problem.goal.model, problem.goal.hand
+    n_stacks = len(goal_model)
+    if len(problem.initial.model) != n_stacks:
+        return None
+
+    node = Node(problem.initial)
+    tested = 0
+    target = None
+
+    while True:
+
+        state = node.state
+        model = state.model
+
+        tested += 1
+        if problem.goal_test(state):
+            return node, node.depth, tested
+
+        if (test_limit != None and tested > test_limit) or _stopped(endpoint):
+            return None
+
+        # lunghezza del tratto di ogni pila che coincide con lo stato goal
+        prefix = []
+        for stack, target_stack in zip(model, goal_model):
+            j = 0
+            while j < len(stack) and j < len(target_stack) and stack[j] == target_stack[j]:
+                j += 1
+            prefix.append(j)
+
+        def slot(block):
+            # pila in cui il blocco può essere posato nella sua posizione finale
+            i = problem.goal_stack[block]
+            if i != None and prefix[i] == len(model[i]) and prefix[i] < len(goal_model[i]) \
+               and goal_model[i][prefix[i]] == block:
+                return i
+            return None
+
+        def dump(exclude):
+            # pila sulla quale posare temporaneamente un blocco
+            candidates = []
+            for i, stack in enumerate(model):
+                if i in exclude:
+                    continue
+                if len(stack) == 0 and len(goal_model[i]) == 0:
+                    priority = 0
+                elif prefix[i] < len(stack) or prefix[i] == len(goal_model[i]):
+                    priority = 1
+                else:
+                    priority = 2
+                candidates.append((priority, len(stack), i))
+            return min(candidates)[2] if candidates else None
+
+        if state.hand != None:
+            dst = slot(state.hand)
+            if dst == None:
+                dst = dump(())
+            if dst == None:
+                return None
+            node = _put(problem, node, dst)
+            continue
+
+        # posizione dei blocchi fuori posto (blocchi con lo stesso
+        # identificativo hanno lo stesso codice)
+        position = {}
+        for i, stack in enumerate(model):
+            for j in range(prefix[i], len(stack)):
+                position[stack[j]] = (i, j)
+
+        if target == None:
+            # sceglie la pila goal il cui prossimo blocco richiede meno spostamenti
+            candidates = []
+            for g, target_stack in enumerate(goal_model):
+                k = prefix[g]
+                if k < len(target_stack):
+                    s, j = position[target_stack[k]]
+                    cost = len(model[g]) - k
+                    if s != g:
+                        cost += len(model[s]) - j - 1
+                    candidates.append((cost, g))
+            if len(candidates) == 0:
+                # tutte le pile sono al loro posto: resta da afferrare il blocco goal
+                node = _grab(problem, node, position[goal_hand][0])
+                continue
+            target = min(candidates)[1]
+
+        g = target
+        block = goal_model[g][prefix[g]]
+        s, j = position[block]
+
+        if s != g and j == len(model[s]) - 1 and prefix[g] == len(model[g]):
+            # il blocco è libero e la pila goal è pronta
+            node = _put(problem, _grab(problem, node, s), g)
+            target = None
+            continue
+
+        # libera la cima della pila goal, poi il blocco cercato
+        src = g if prefix[g] < len(model[g]) else s
+        top = model[src][-1]
+        dst = slot(top)
+        if dst == None:
+            dst = dump((g,) if top == block else (g, s))
+        if dst == None:
+            return None
+        node = _put(problem, _grab(problem, node, src), dst)
+
+# ______________________________________________________________________________
+# Problema basato sui colori
+
+
+def color_grouping_planner(problem, endpoint = None, test_limit = None):
+    '''
+        Pianificatore greedy per ``ColorBasedBlockWorldProblem``.
+
+        Poiché un blocco può essere posato solo sopra ad un blocco dello stesso colore,
+        il blocco alla base di ogni pila non cambia finché la pila non viene svuotata:
+        per ogni colore viene scelta come base la pila, con un blocco di quel colore alla
+        base, che ha più blocchi dello stesso colore nella parte bassa.
+
+        Ad ogni passo il pianificatore sposta un blocco in cima ad una pila sulla
+        base del suo colore, se questa contiene solo blocchi di quel colore; altrimenti
+        sposta il blocco in cima alla pila con meno blocchi da smontare sopra ad un'altra
+        pila con la cima dello stesso colore, evitando di tornare in stati già visitati.
+        Restituisce None se nessuna mossa è possibile: in tal caso il problema
+        potrebbe comunque ammettere soluzione.
+    '''
+    color = problem.color
+    node = Node(problem.initial)
+    tested = 0
+
+    # per ogni colore, indice della pila di base
+    model = problem.initial.model
+    base = {}
+    for i, stack in enumerate(model):
+        if len(stack) > 0:
+            c = color[stack[0]]
+            j = 0
+            while j < len(stack) and color[stack[j]] == c:
+                j += 1
+            if c not in base or (j, j - len(stack)) > base[c][0]:
+                base[c] = ((j, j - len(stack)), i)
+    base = {c : b[1] for c, b in base.items()}
+
+    visited = {problem.initial}
+    limit = 2 * len(problem.encoder) ** 2 + 2
+
+    while True:
+
+        state = node.state
+        model = state.model
+
+        tested += 1
+        if problem.goal_test(state):
+            return node, node.depth, tested
+
+        if (test_limit != None and tested > test_limit) or tested > limit or _stopped(endpoint):
+            return None
+
+        # numero di blocchi dello stesso colore alla base di ogni pila di base
+        pure = {}
+        for c, i in base.items():
+            stack = model[i]
+            j = 0
+            while j < len(stack) and color[stack[j]] == c:
+                j += 1
+            pure[i] = j
+
+        def moves(c, src):
+            # pile sulle quali un blocco di colore c può essere posato
+            if c in base and base[c] != src and pure[base[c]] == len(model[base[c]]):
+                return [(0, 0, 0, base[c])]
+            return [(1, i in pure, len(stack), i) for i, stack in enumerate(model)
+                    if i != src and len(stack) > 0 and color[stack[-1]] == c]
+
+        if state.hand != None:
+            candidates = moves(color[state.hand], None)
+            if len(candidates) == 0:
+                return None
+            node = _put(problem, node, min(candidates)[3])
+            continue
+
+        candidates = []
+        for i, stack in enumerate(model):
+            to_move = len(stack) - pure.get(i, 0)
+            if to_move > 0:
+                for priority, is_base, size, dst in moves(color[stack[-1]], i):
+                    candidates.append((priority, to_move, is_base, size, i, dst))
+
+        for *_, src, dst in sorted(candidates):
+            child = _put(problem, _grab(problem, node, src), dst)
+            if child.state not in visited:
+                break
+        else:
+            return None
+
+        visited.add(child.state)
+        node = child
@@ -1,5 +1,7 @@
 from modelling.stateSpaceSearch import *
 from modelling.model import BlockWorldModel
+from modelling.encoding import BlockEncoder, EncodedState, encode_action, action_type, action_stack
+from modelling.patternDatabase import PatternDatabase
 
 class Action:
     '''
@@ -69,7 +71,119 @@ class OnTable(Action):
         return "Metti " + str(self.block_id) + " sul tavolo"
 
 
-class BlockWorldProblem(Problem):
+class EncodedBlockWorldProblem(Problem):
+    '''
+        Classe base dei problemi Block World con stati codificati.
+
+        Gli stati (vedi ``EncodedState``) sono coppie (m, h) in cui m è una tupla di pile
+        di interi ed h è l'intero associato al blocco in mano al robot (None se la mano è vuota).
+        Ogni stato memorizza inoltre il proprio hash Zobrist, aggiornato ad ogni azione.
+        Anche le azioni sono codificate come interi (vedi ``encode_action``).
+
+        Blocchi ed azioni vengono riconvertiti nei rispettivi oggetti solo
+        attraverso il metodo ``decode_path``, una volta terminata la ricerca.
+
+        Ogni problema mette a disposizione più euristiche, elencate nel dizionario
+        ``HEURISTICS`` che associa al nome dell'euristica il metodo che la calcola
+        e le proprietà dichiarate (ammissibile, consistente), verificabili
+        con il modulo ``modelling.heuristicCheck``.
+    '''
+
+    HEURISTICS = {
+        # nome : (metodo, ammissibile, consistente)
+        "Blind": ("h_blind", True, True)
+    }
+
+    def __init__(self, encoder, initial, goal=None):
+        self.encoder = encoder
+        super().__init__(initial, goal)
+
+    def use_heuristic(self, name):
+        '''
+            Seleziona l'euristica restituita dal metodo ``h``.
+
+            Parametri:
+
+                name : str
+                    Nome dell'euristica (una delle chiavi di ``HEURISTICS``)
+        '''
+        if name not in self.HEURISTICS:
+            raise ValueError("Euristica non disponibile: " + str(name))
+        self.heuristic = name
+        self._h = getattr(self, self.HEURISTICS[name][0])
+
+    def h(self, node):
+        return self._h(node)
+
+    def h_blind(self, node):
+        '''
+            Euristica nulla: A* si comporta come la ricerca a costo uniforme
+        '''
+        return 0
+
+    def result(self, state, action):
+
+        stack_index = action_stack(action)
+
+        if action_type(action) == Action.TYPE_GRAB:
+            # il blocco in cima alla pila passa in mano al robot
+            top_index = len(state.model[stack_index]) - 1
+            model, hand = BlockWorldModel.modelPop(state.model, stack_index, top_index)
+            # l'hash del nuovo stato si ottiene da quello del padre in tempo costante
+            key = state.key ^ self.encoder.blockKey(hand, stack_index, top_index) ^ self.encoder.handKey(hand)
+            return EncodedState(model, hand, key)
+
+        # il blocco in mano al robot viene aggiunto in cima alla pila
+        height = len(state.model[stack_index])
+        model = BlockWorldModel.modelAdd(state.model, state.hand, stack_index)
+        key = state.key ^ self.encoder.handKey(state.hand) ^ self.encoder.blockKey(state.hand, stack_index, height)
+        return EncodedState(model, None, key)
+
+    def decode_action(self, state, action):
+        '''
+            Converte una azione codificata nel corrispondente oggetto ``Action``.
+
+            Parametri:
+
+                state : tuple
+                    Stato codificato nel quale l'azione viene eseguita
+
+                action : int
+                    Azione codificata
+        '''
+        if action == None:
+            return None
+
+        stack_index = action_stack(action)
+        stack = state.model[stack_index]
+        blocks = self.encoder.blocks
+
+        if action_type(action) == Action.TYPE_GRAB:
+            return Grab(blocks[stack[-1]].id, stack_index)
+
+        if action_type(action) == Action.TYPE_MOVE:
+            return PutOn(blocks[state.hand].id, blocks[stack[-1]].id, stack_index)
+
+        return OnTable(blocks[state.hand].id, stack_index)
+
+    def decode_path(self, path):
+        '''
+            Converte un percorso di nodi con stati codificati nell'equivalente percorso
+            di nodi i cui stati sono formati da oggetti ``Block`` e le cui azioni sono
+            oggetti ``Action``.
+        '''
+        decoded = []
+        parent = None
+        for node in path:
+            action = None
+            if node.parent != None:
+                action = self.decode_action(node.parent.state, node.action)
+            parent = Node(self.encoder.decodeState(node.state), parent, action, node.path_cost)
+            decoded.append(parent)
+        return decoded
+
+
+class BlockWorldProblem(EncodedBlockWorldProblem):
     '''
         Problema Block World
         -------
@@ -89,92 +203,149 @@ class BlockWorldProblem(Problem):
 
         Un generico stato del problema è rappresentato da una coppia (m, h), dove
         m rappresenta la disposizione corrente dei blocchi, mentre h è il blocco in mano al robot.
+        Blocchi ed azioni sono codificati come interi (vedi ``EncodedBlockWorldProblem``).
     '''
 
-    def __init__(self, model, goal, init_hand = None, goal_hand = None):
-        if isinstance(model, tuple) and isinstance(goal, tuple):
-            super().__init__((model, init_hand), (goal, goal_hand))
-        else:
-            super().__init__((BlockWorldModel.asTuple(model), init_hand), (BlockWorldModel.asTuple(goal), goal_hand))
+    HEURISTICS = {
+        # nome : (metodo, ammissibile, consistente)
+        "Fast": ("h_fast", False, False),
+        "Admissible": ("h_misplaced", True, True),
+        "Pattern Database": ("h_pattern_database", True, True),
+        "Blind": ("h_blind", True, True)
+    }
 
-    def actions(self, state):
+    def __init__(self, model, goal, init_hand = None, goal_hand = None,
+                 heuristic = "Fast", pattern_size = 4, combine = "add"):
+        '''
+            Parametri:
 
-        actions = []
+                heuristic : str
+                    Nome dell'euristica utilizzata (vedi ``HEURISTICS``)
 
-        # se il robot NON ha un blocco in mano...
-        if state[1] == None:
-            # ... può afferrare un qualsiasi blocco in cima ad uno stack
-            for i,stack in enumerate(state[0]):
-                if len(stack) > 0:
-                    actions.append(Grab(stack[-1].id, i))
-        else:
-            # altrimenti ...
-            for i,stack in enumerate(state[0]):
-                if len(stack) > 0:
-                    # ... può posare il blocco in cima ad uno stack ...
-                    actions.append(PutOn(state[1].id, stack[-1].id, i))
-                else:
-                    # ... oppure può posarlo sul tavolo (stack vuoto)
-                    actions.append(OnTable(state[1].id, i)) # posa sul tavolo in uno stack vuoto
+                pattern_size : int
+                    Numero massimo di blocchi dei pattern dell'euristica
+                    "Pattern Database" (vedi ``PatternDatabase``)
+
+                combine : str
+                    Modalità di combinazione dei valori dei pattern ("add" o "max")
+        '''
+        encoder = BlockEncoder(model, init_hand)
 
+        # gli interi dei blocchi sono assegnati a partire dal modello iniziale,
+        # per cui lo stato goal non può contenere blocchi diversi
+        goal_blocks = [b for stack in goal for b in stack] + ([goal_hand] if goal_hand != None else [])
+        missing = sorted(set(b.id for b in goal_blocks if b.id not in encoder.index))
+        if len(missing) > 0:
+            raise ValueError("Blocchi dello stato goal non presenti nel modello iniziale: " + ", ".join(missing))
 
-        return actions
+        super().__init__(encoder, encoder.encodeState(model, init_hand), encoder.encodeState(goal, goal_hand))
 
+        # per ogni blocco, indice della pila che lo contiene nello stato goal
+        # (None se nello stato goal il blocco è in mano al robot)
+        self.goal_stack = [None] * len(encoder)
+        for i,stack in enumerate(self.goal[0]):
+            for block in stack:
+                self.goal_stack[block] = i
 
-    def result(self, state, action):
+        self.use_heuristic(heuristic)
+        self.pattern_database = None
+        if heuristic == "Pattern Database":
+            self.pattern_database = PatternDatabase(self, pattern_size, combine)
 
-        if action.type == Action.TYPE_GRAB:
-            top_index = len(state[0][action.stack_index]) - 1
-            model, hand = BlockWorldModel.modelPop(state[0], action.stack_index, top_index)
-            return (model, hand)
+    def actions(self, state):
 
-        if action.type == Action.TYPE_MOVE:
-            model = BlockWorldModel.modelAdd(state[0], state[1], action.dst_stack_index)
-            return (model, None)
+        # se il robot NON ha un blocco in mano...
+        if state.hand == None:
+            # ... può afferrare un qualsiasi blocco in cima ad uno stack
+            return [encode_action(Action.TYPE_GRAB, i) for i,stack in enumerate(state.model) if len(stack) > 0]
 
-        if action.type == Action.TYPE_PUT:
-            model = BlockWorldModel.modelAdd(state[0], state[1], action.dst_stack_index)
-            return (model, None)
+        # altrimenti può posare il blocco in cima ad uno stack
+        # oppure sul tavolo (stack vuoto)
+        return [encode_action(Action.TYPE_MOVE if len(stack) > 0 else Action.TYPE_PUT, i) 
+                for i,stack in enumerate(state.model)]
 
 
     def goal_test(self, state):
+        # il confronto tra gli hash precede quello tra i modelli
+        return state == self.goal
 
-        # controlla se l'oggetto in mano al robot coincide con quello nello stato finale
-        if state[1] != self.goal[1]:
-            return False
+    def inverse_action(self, state, action):
+        '''
+            Restituisce l'azione che annulla ``action``: eseguita nello stato ottenuto
+            applicando ``action`` a ``state``, riporta il problema nello stato ``state``.
 
-        # controlla se tutti i blocchi nel modello corrente ed in quello finale concidono
-        for i,stack in enumerate(self.goal[0]):
-            if len(state[0][i]) != len(stack):
-                return False
-            for j,block in enumerate(stack):
-                if block != state[0][i][j]:
-                    return False
+            Tutte le azioni del problema sono reversibili: un blocco afferrato può
+            essere riposato sulla pila di partenza ed un blocco posato può essere afferrato di nuovo.
+        '''
+        stack_index = action_stack(action)
 
-        return True
+        if action_type(action) == Action.TYPE_GRAB:
+            # il blocco torna sulla pila da cui è stato afferrato,
+            # sul tavolo se la pila è rimasta vuota
+            if len(state.model[stack_index]) > 1:
+                return encode_action(Action.TYPE_MOVE, stack_index)
+            return encode_action(Action.TYPE_PUT, stack_index)
 
-    def h(self, node):
-        
+        return encode_action(Action.TYPE_GRAB, stack_index)
+
+    def h_fast(self, node):
+        '''
+            Euristica veloce ma non ammissibile: i blocchi da spostare che nello stato goal
+            si trovano nella stessa pila valgono 4, gli altri 2.
+        '''
         h = 0
 
-        hand = node.state[1]
+        hand = node.state.hand
         target_hand = self.goal[1]
         if hand != target_hand:
             h += 1
 
-        model = node.state[0]
+        model = node.state.model
         goal = self.goal[0]
 
         for i, stack in enumerate(model):
-            for j, block in enumerate(stack):
-                if self.toMove(model, i, j):
-                    target_stack_idx, _ = BlockWorldProblem.block_index(goal, block.id)
-                    if target_stack_idx == i:
-                        h += 4
-                    else :
-                        h += 2
+            # i blocchi sopra al primo blocco fuori posto devono essere spostati
+            target = goal[i]
+            j = 0
+            while j < len(stack) and j < len(target) and stack[j] == target[j]:
+                j += 1
+            for block in stack[j:]:
+                if self.goal_stack[block] == i:
+                    h += 4
+                else :
+                    h += 2
         return h
 
+    def h_misplaced(self, node):
+        '''
+            Euristica ammissibile e consistente.
+
+            Ogni blocco sopra al primo blocco fuori posto di una pila deve essere
+            afferrato e posato almeno una volta (2 azioni, 1 se nello stato goal
+            il blocco è in mano al robot), mentre il blocco in mano al robot deve essere
+            posato (1 azione) se non è quello dello stato goal.
+            Ogni azione sposta un solo blocco e cambia il valore al più di 1.
+        '''
+        hand = node.state.hand
+        target_hand = self.goal[1]
+        h = 1 if hand != None and hand != target_hand else 0
+
+        goal = self.goal[0]
+        for i, stack in enumerate(node.state.model):
+            target = goal[i]
+            j = 0
+            while j < len(stack) and j < len(target) and stack[j] == target[j]:
+                j += 1
+            for block in stack[j:]:
+                h += 1 if block == target_hand else 2
+        return h
+
+    def h_pattern_database(self, node):
+        '''
+            Euristica del database di pattern (vedi ``PatternDatabase``)
+        '''
+        return self.pattern_database(node)
+
     def toMove(self, model, stack_idx, stack_pos):
         block = model[stack_idx][stack_pos]
         target = self.getBlockByIndex(stack_idx, stack_pos)
@@ -250,7 +421,7 @@ class BlockWorldProblem(Problem):
                     return i,j
         return None, None
 
-class ColorBasedBlockWorldProblem(Problem):
+class ColorBasedBlockWorldProblem(EncodedBlockWorldProblem):
     '''
         Problema Block World basato su Colori
         -------
@@ -271,71 +442,62 @@ class ColorBasedBlockWorldProblem(Problem):
 
         Un generico stato del problema è rappresentato da una coppia (m, h), dove
         m rappresenta la disposizione corrente dei blocchi, mentre h è il blocco in mano al robot.
+        Blocchi ed azioni sono codificati come interi (vedi ``EncodedBlockWorldProblem``).
     '''
 
-    def __init__(self, model, hand = None):
-        if isinstance(model, tuple):
-            initial = (model, hand)
-        else:
-            initial = (BlockWorldModel.asTuple(model), hand)
-        super().__init__(initial, None)
+    HEURISTICS = {
+        # nome : (metodo, ammissibile, consistente)
+        "Fast": ("h_fast", True, True),
+        "Admissible": ("h_blocks_to_move", True, True),
+        "Blind": ("h_blind", True, True)
+    }
 
-    def actions(self, state):
+    def __init__(self, model, hand = None, heuristic = "Fast"):
+        encoder = BlockEncoder(model, hand)
+        super().__init__(encoder, encoder.encodeState(model, hand), None)
 
-        actions = []
-        # se la mano del robot è vuota ...
-        if state[1] == None:
-            for i,stack in enumerate(state[0]):
-                # ... per ogni pila non vuota ...
-                if len(stack) > 0:
-                    # ... il robot può afferrare il blocco in cima alla pila
-                    actions.append(Grab(stack[-1].id, i))
-        else:
-            # altrimenti, per ogni pila ...
-            for i,stack in enumerate(state[0]):
-                # se la pila non è vuota e
-                # il colore del blocco in mano al robot coincide con quello in cima alla pila ...
-                if len(stack) > 0 and stack[-1].color_group == state[1].color_group:
-                    # ... il robot può posare il blocco in cima a questa pila
-                    actions.append(PutOn(state[1].id, stack[-1].id, i))
-
-        return actions
+        # per ogni blocco, intero associato al suo gruppo di colore
+        color_groups = {}
+        self.color = tuple(color_groups.setdefault(b.color_group, len(color_groups)) for b in encoder.blocks)
 
+        self.use_heuristic(heuristic)
 
-    def result(self, state, action):
+    def actions(self, state):
 
-        if action.type == Action.TYPE_GRAB:
-            top_index = len(state[0][action.stack_index]) - 1
-            model, hand = BlockWorldModel.modelPop(state[0], action.stack_index, top_index)
-            return (model, hand)
+        # se la mano del robot è vuota ...
+        if state.hand == None:
+            # ... per ogni pila non vuota il robot può afferrare il blocco in cima alla pila
+            return [encode_action(Action.TYPE_GRAB, i) for i,stack in enumerate(state.model) if len(stack) > 0]
 
-        if action.type == Action.TYPE_MOVE:
-            model = BlockWorldModel.modelAdd(state[0], state[1], action.dst_stack_index)
-            return (model, None)
+        # altrimenti, per ogni pila non vuota in cui il colore del blocco in cima
+        # coincide con quello del blocco in mano al robot ...
+        hand_color = self.color[state.hand]
+        # ... il robot può posare il blocco in cima a questa pila
+        return [encode_action(Action.TYPE_MOVE, i) for i,stack in enumerate(state.model) 
+                if len(stack) > 0 and self.color[stack[-1]] == hand_color]
 
 
     def goal_test(self, state):
 
-        if state[1] != None:
+        if state.hand != None:
             return False
 
-        found_colors = []
+        found_colors = set()
 
-        for stack in state[0]:
+        for stack in state.model:
             if len(stack) > 0:
-                stack_col = stack[0].color_group
-                try:
-                    found_colors.index(stack_col)
+                stack_col = self.color[stack[0]]
+                if stack_col in found_colors:
                     return False
-                except ValueError:
-                    found_colors.append(stack_col)
-                    if len([b for b in stack if b.color_group != stack_col]) > 0:
+                found_colors.add(stack_col)
+                for b in stack:
+                    if self.color[b] != stack_col:
                         return False
 
         return True
 
 
-    def h(self, node):
+    def h_fast(self, node):
 
         '''
             Funzione euristica del problema Blocks World basato sui colori.
@@ -350,12 +512,12 @@ class ColorBasedBlockWorldProblem(Problem):
             e si aggiunge 1 se in quello stato il robot ha un blocco in mano.
         '''
         
-        h = 0 if node.state[1] == None else 1
+        h = 0 if node.state.hand == None else 1
 
         color_group_values = {}
 
-        for stack in node.state[0]:
-            colors_in_stack = unique(map(lambda b : b.color_group, stack))
+        for stack in node.state.model:
+            colors_in_stack = set(self.color[b] for b in stack)
             for color_group in colors_in_stack:
                     if color_group in color_group_values:
                         color_group_values[color_group] += 1
@@ -373,3 +535,38 @@ class ColorBasedBlockWorldProblem(Problem):
 
         h += sum(color_group_values.values())
         return h
+
+    def h_blocks_to_move(self, node):
+        '''
+            Euristica ammissibile e consistente, più informata di ``h_fast``.
+
+            Ogni pila finale contiene blocchi di un solo colore ed il blocco alla base di
+            una pila non cambia finché la pila non viene svuotata, per cui devono essere spostati:
+
+            - i blocchi sopra al primo cambio di colore di ogni pila;
+            - per ogni colore, tutti i blocchi delle pile con la base di quel colore
+              tranne quelli della pila con più blocchi del colore alla base.
+
+            Ognuno di questi blocchi deve essere afferrato e posato (2 azioni),
+            mentre il blocco in mano al robot deve essere posato (1 azione).
+        '''
+        h = 0 if node.state.hand == None else 1
+
+        # per ogni colore, lunghezza massima e totale dei tratti
+        # di quel colore alla base delle pile
+        longest = {}
+        total = {}
+        for stack in node.state.model:
+            if len(stack) == 0:
+                continue
+            c = self.color[stack[0]]
+            j = 1
+            while j < len(stack) and self.color[stack[j]] == c:
+                j += 1
+            h += 2 * (len(stack) - j)
+            longest[c] = max(longest.get(c, 0), j)
+            total[c] = total.get(c, 0) + j
+
+        for c in total:
+            h += 2 * (total[c] - longest[c])
+        return h
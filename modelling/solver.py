@@ -1,5 +1,12 @@
-from utils.channel import Channel
+from utils.channel import SearchSignal
 from modelling.stateSpaceSearch import *
+from modelling.parallelSearch import hash_distributed_astar_search, parallel_breadth_first_search
+from modelling.planner import domain_specific_planner
+from modelling.externalSearch import external_breadth_first_search
+from modelling.checkpoint import CheckpointException
+from modelling.telemetry import SearchTelemetry
+from modelling.planOptimizer import optimize_plan
+import inspect
 import threading
 import time
 
@@ -9,7 +16,15 @@ solver_dict = {
     "Depth First Tree Search": depth_first_tree_search,
     "Depth First Graph Search": depth_first_graph_search,
     "Iterative Depth First Search": iterative_deepening_search,
-    "A* Search": astar_search
+    "A* Search": astar_search,
+    "IDA* Search": iterative_deepening_astar_search,
+    "Bidirectional Breadth First Search": bidirectional_breadth_first_search,
+    "Anytime Weighted A* Search": anytime_weighted_astar_search,
+    "Memory Bounded A* Search": memory_bounded_astar_search,
+    "Hash Distributed A* Search": hash_distributed_astar_search,
+    "Parallel Breadth First Search": parallel_breadth_first_search,
+    "Domain Specific Planner": domain_specific_planner,
+    "External Memory Breadth First Search": external_breadth_first_search
 }
 
 
@@ -19,10 +34,17 @@ class AsyncBWPSolver():
         self.problem = problem
         self.algorithm = algorithm
         self.test_limit = test_limit
+        self.bitstate_bytes = None
+        self.checkpoint = None
+        self.telemetry_callback = None
+        self.plan_cache = None
+        self.optimize_window = None
+        self.scratch_dir = None
+        self.external_max_bytes = None
+        self.memory_bound = None
 
         self.done_event = threading.Event()
-        self.asyncChannel = Channel()
-        self.channelClient = self.asyncChannel.registerClient()
+        self.signal = SearchSignal()
 
         if callback != None:
             self.callback = callback
@@ -41,37 +63,177 @@ class AsyncBWPSolver():
     def setTestLimit(self, test_limit):
         self.test_limit = test_limit
 
+    def setBitstate(self, n_bytes):
+        '''
+            Imposta la memoria (in byte) del filtro utilizzato dagli algoritmi che supportano
+            il rilevamento approssimato dei duplicati; None per il rilevamento esatto.
+        '''
+        self.bitstate_bytes = n_bytes
+
+    def setCheckpoint(self, checkpoint):
+        '''
+            Imposta il checkpoint (``SearchCheckpoint``) utilizzato dagli algoritmi che lo supportano
+            per salvare la ricerca e per riprenderla se il file esiste già; None per disattivarlo.
+        '''
+        self.checkpoint = checkpoint
+
+    def setTelemetryCallback(self, telemetry_callback):
+        '''
+            Imposta la funzione che riceve i campioni di telemetria (vedi ``SearchTelemetry``)
+            degli algoritmi che la supportano; None per disattivare la telemetria.
+        '''
+        self.telemetry_callback = telemetry_callback
+
+    def setPlanCache(self, plan_cache):
+        '''
+            Imposta la cache (``PlanCache``) in cui cercare i piani già trovati
+            e salvare quelli nuovi; None per non utilizzarla.
+        '''
+        self.plan_cache = plan_cache
+
+    def setPlanOptimization(self, window):
+        '''
+            Imposta la dimensione delle finestre con cui ``optimize_plan`` accorcia
+            i piani trovati; None per restituire i piani così come sono stati trovati.
+        '''
+        self.optimize_window = window
+
+    def setExternalMemory(self, scratch_dir, max_bytes):
+        '''
+            Imposta la cartella dei file temporanei (None per quella di sistema) e la memoria massima
+            (in byte, None per il valore predefinito) degli algoritmi che salvano la ricerca su disco.
+        '''
+        self.scratch_dir = scratch_dir
+        self.external_max_bytes = max_bytes
+
+    def setMemoryBound(self, max_bytes):
+        '''
+            Imposta la memoria massima (in byte) degli algoritmi con limite di memoria
+            (Memory Bounded A*); None per il valore predefinito.
+        '''
+        self.memory_bound = max_bytes
+
     def isDone(self):
         return self.done_event.is_set()
 
     def stopSolving(self):
         if not self.isDone():
-            self.channelClient.send({"continue" : False})
+            self.signal.stop()
+
+    def pauseSolving(self):
+        if not self.isDone():
+            self.signal.pause()
+
+    def resumeSolving(self):
+        self.signal.resume()
 
     def solve(self):
         if self.problem != None:
             solver = solver_dict[self.algorithm]
+            # ogni ricerca ha il proprio segnale, per cui una richiesta di arresto
+            # ricevuta dopo la fine di una ricerca non interrompe quella successiva
+            self.signal = SearchSignal()
             solveThread = threading.Thread(target=solve_problem_async, 
-                                           args=[self.problem, solver, self.asyncChannel.server, 
-                                                 self.done_event, self.callback, self.test_limit])
-            self.channelClient.send({"continue":True})
+                                           args=[self.problem, solver, self.signal, 
+                                                 self.done_event, self.callback, self.test_limit,
+                                                 self.bitstate_bytes, self.checkpoint, self.telemetry_callback,
+                                                 self.plan_cache, self.optimize_window,
+                                                 self.scratch_dir, self.external_max_bytes, self.memory_bound])
             self.done_event.clear()
             solveThread.start()
 
     
-def solve_problem_async(problem, solver, endpoint, done_event, callback, test_limit):
+def solve_problem_async(problem, solver, endpoint, done_event, callback, test_limit, bitstate_bytes = None,
+                        checkpoint = None, telemetry_callback = None, plan_cache = None, optimize_window = None,
+                        scratch_dir = None, external_max_bytes = None, memory_bound = None):
 
     start = time.time()
-    result = solver(problem = problem, endpoint=endpoint, test_limit = test_limit)
+
+    if plan_cache != None:
+        # le opzioni che modificano il risultato della ricerca fanno parte della chiave
+        key_options = {"bitstate_bytes": bitstate_bytes, "optimize_window": optimize_window,
+                       "memory_bound": memory_bound if "max_bytes" in inspect.signature(solver).parameters else None}
+        key = plan_cache.key(problem, solver.__name__, {k: v for k, v in key_options.items() if v != None})
+        cached = plan_cache.get(key, problem)
+        if cached != None:
+            node, info = cached
+            info.update({
+                "solution": problem.decode_path(node.path()),
+                "time": time.time() - start,
+                "search_time": info["time"],
+                "cached": True,
+                "final": True
+            })
+            done_event.set()
+            callback(True, info)
+            return
+
+    options = {}
+    if "on_solution" in inspect.signature(solver).parameters:
+        # gli algoritmi anytime comunicano ogni soluzione migliore
+        # trovata mentre la ricerca è ancora in corso
+        options["on_solution"] = lambda node, expanded, tested : callback(True, {
+            "solution": problem.decode_path(node.path()),
+            "expanded": expanded,
+            "tested": tested,
+            "time": time.time() - start,
+            "final": False
+        })
+
+    if bitstate_bytes != None and "bitstate_bytes" in inspect.signature(solver).parameters:
+        options["bitstate_bytes"] = bitstate_bytes
+
+    if checkpoint != None and "checkpoint" in inspect.signature(solver).parameters:
+        options["checkpoint"] = checkpoint
+
+    if "scratch_dir" in inspect.signature(solver).parameters:
+        # la memoria massima viene passata solo agli algoritmi su disco: per gli altri
+        # (ad esempio Memory Bounded A*) il parametro max_bytes ha un significato diverso
+        if scratch_dir != None:
+            options["scratch_dir"] = scratch_dir
+        if external_max_bytes != None:
+            options["max_bytes"] = external_max_bytes
+    elif memory_bound != None and "max_bytes" in inspect.signature(solver).parameters:
+        options["max_bytes"] = memory_bound
+
+    if telemetry_callback != None and "telemetry" in inspect.signature(solver).parameters:
+        options["telemetry"] = SearchTelemetry(telemetry_callback)
+
+    try:
+        result = solver(problem = problem, endpoint=endpoint, test_limit = test_limit, **options)
+    except (CheckpointException, OSError) as e:
+        # ad esempio checkpoint non valido o cartella dei file temporanei non accessibile
+        done_event.set()
+        callback(False, {"error": str(e)})
+        return
+    original_length = None
+    if result != None and optimize_window != None:
+        # il piano trovato viene accorciato prima di essere restituito
+        optimized = optimize_plan(problem, result[0], optimize_window, endpoint = endpoint)
+        if optimized.path_cost < result[0].path_cost:
+            original_length = len(result[0].path()) - 1
+            result = (optimized,) + tuple(result[1:])
     stop = time.time()
     if result != None:
-        done_event.set()
-        callback(True, {
-            "solution": result[0].path(), 
+        info = {
+            "solution": problem.decode_path(result[0].path()), 
             "expanded": result[1], 
             "tested": result[2], 
-            "time": stop - start
-        })
+            "time": stop - start,
+            "final": True
+        }
+        # alcuni algoritmi restituiscono informazioni aggiuntive sulla ricerca
+        if len(result) > 3:
+            info.update(result[3])
+        if original_length != None:
+            info["original_length"] = original_length
+        # il risultato di una ricerca interrotta o che ha raggiunto il limite di nodi
+        # testati (ad esempio quello parziale di un algoritmo anytime) non viene salvato
+        limit_reached = test_limit != None and result[2] > test_limit
+        if plan_cache != None and not getattr(endpoint, "stopped", False) and not limit_reached:
+            plan_cache.put(key, result[0], {k: v for k, v in info.items() if k not in ("solution", "final")})
+        done_event.set()
+        callback(True, info)
         return
 
     done_event.set()
@@ -5,6 +5,8 @@ ATTENZIONE: Parte del contenuto di questo file è stato ripreso della libreria a
 """
 
 import sys
+import heapq
+import itertools
 from collections import deque
 
 from modelling.utils import *
@@ -58,6 +60,20 @@ class Problem:
         and related algorithms try to maximize this value."""
         raise NotImplementedError
 
+    def inverse_action(self, state, action):
+        """Return the action that undoes the given action: applied to
+        result(state, action), it leads back to state. Only problems whose
+        actions are all reversible can implement this method, which is
+        needed to search backward from the goal."""
+        raise NotImplementedError
+
+    def decode_path(self, path):
+        """Return the path (a list of nodes) in the representation shown to
+        the user. Problems that use a compact internal encoding of states
+        and actions should override this method; the default returns the
+        path unchanged."""
+        return path
+
 # ______________________________________________________________________________
 
 
@@ -126,7 +142,7 @@ class Node:
         return hash(self.state)
 
 
-def breadth_first_tree_search(problem, endpoint = None, test_limit = None):
+def breadth_first_tree_search(problem, endpoint = None, test_limit = None, telemetry = None):
     """
     Search the shallowest nodes in the search tree first.
     Search through the successors of a problem to find a goal.
@@ -165,10 +181,13 @@ def breadth_first_tree_search(problem, endpoint = None, test_limit = None):
             if message != None and "continue" in message:
                 run = message["continue"]
 
+        if telemetry != None and telemetry.due():
+            telemetry.publish(expanded, tested, len(frontier), depth = node.depth)
+
     return None
 
 
-def depth_first_tree_search(problem, endpoint = None, test_limit = None):
+def depth_first_tree_search(problem, endpoint = None, test_limit = None, telemetry = None):
     """
     Search the deepest nodes in the search tree first.
     Search through the successors of a problem to find a goal.
@@ -207,18 +226,28 @@ def depth_first_tree_search(problem, endpoint = None, test_limit = None):
             if message != None and "continue" in message:
                 run = message["continue"]
 
+        if telemetry != None and telemetry.due():
+            telemetry.publish(expanded, tested, len(frontier), depth = node.depth)
+
     return None
 
 
-def depth_first_graph_search(problem, endpoint = None, test_limit = None):
+def depth_first_graph_search(problem, endpoint = None, test_limit = None, bitstate_bytes = None,
+                             telemetry = None):
     """
     Search the deepest nodes in the search tree first.
     Search through the successors of a problem to find a goal.
     The argument frontier should be an empty queue.
     Does not get trapped by loops.
     If two paths reach a state, only use the first one.
+    If bitstate_bytes is given, duplicates are detected approximately
+    (see bitstate_graph_search).
     """
-    frontier = [(Node(problem.initial))]  # Stack
+    if bitstate_bytes != None:
+        return bitstate_graph_search(problem, endpoint, test_limit, bitstate_bytes, lifo=True,
+                                     telemetry=telemetry)
+
+    frontier = LIFOFrontier([Node(problem.initial)])  # Stack with hashed membership
     
     tested = 0
     expanded = 0
@@ -253,15 +282,29 @@ def depth_first_graph_search(problem, endpoint = None, test_limit = None):
             if message != None and "continue" in message:
                 run = message["continue"]
 
+        if telemetry != None and telemetry.due():
+            telemetry.publish(expanded, tested, len(frontier), len(explored), depth = node.depth)
+
     return None
 
 
-def breadth_first_graph_search(problem, endpoint = None, test_limit = None):
+def breadth_first_graph_search(problem, endpoint = None, test_limit = None, bitstate_bytes = None,
+                               checkpoint = None, telemetry = None):
     """
     Note that this function can be implemented in a
     single line as below:
     return graph_search(problem, FIFOQueue())
+    If bitstate_bytes is given, duplicates are detected approximately
+    (see bitstate_graph_search).
+    If a checkpoint (see modelling.checkpoint) is given, the search resumes
+    from it when available and saves its frontier, explored set and counters
+    at the checkpoint interval and when it is stopped.
+    Like every search in this module, it accepts a telemetry object (see
+    modelling.telemetry) to which it publishes periodic progress samples.
     """
+    if bitstate_bytes != None:
+        return bitstate_graph_search(problem, endpoint, test_limit, bitstate_bytes, telemetry=telemetry)
+
     tested = 0
     expanded = 0
 
@@ -269,9 +312,17 @@ def breadth_first_graph_search(problem, endpoint = None, test_limit = None):
     if problem.goal_test(node.state):
         return node, 1, 0
 
-    frontier = deque([node])
+    frontier = FIFOFrontier([node])  # FIFO queue with hashed membership
     explored = set()
 
+    if checkpoint != None:
+        checkpoint.bind(problem, "breadth_first_graph_search")
+        saved = checkpoint.restore()
+        if saved != None:
+            frontier = FIFOFrontier(saved["frontier"])
+            explored = saved["explored"]
+            expanded, tested = saved["expanded"], saved["tested"]
+
     if endpoint != None:
         message = endpoint.receive()
         if message != None and "continue" in message:
@@ -284,13 +335,15 @@ def breadth_first_graph_search(problem, endpoint = None, test_limit = None):
         if test_limit != None and tested > test_limit:
             break
 
-        node = frontier.popleft()
+        node = frontier.pop()
         explored.add(node.state)
 
         for child in node.expand(problem):
             if child.state not in explored and child not in frontier:
                 expanded += 1
                 if problem.goal_test(child.state):
+                    if checkpoint != None:
+                        checkpoint.clear()
                     return child, expanded, tested
                 frontier.append(child)
                 tested += 1
@@ -300,20 +353,53 @@ def breadth_first_graph_search(problem, endpoint = None, test_limit = None):
             if message != None and "continue" in message:
                 run = message["continue"]
 
+        if telemetry != None and telemetry.due():
+            telemetry.publish(expanded, tested, len(frontier), len(explored), depth = node.depth)
+
+        if checkpoint != None and checkpoint.due():
+            checkpoint.save(frontier, explored, expanded, tested)
+
+    if checkpoint != None:
+        if frontier:
+            checkpoint.save(frontier, explored, expanded, tested)
+        else:
+            checkpoint.clear()
     return None
 
 
-def best_first_graph_search(problem, f, endpoint = None, test_limit = None):
+def best_first_graph_search(problem, f, endpoint = None, test_limit = None, tie_breaker = None, lifo = False,
+                            bitstate_bytes = None, checkpoint = None, telemetry = None):
+    """Search the nodes with the lowest f scores first. Ties on f are
+    broken by tie_breaker(n) if given, then by insertion order (newest
+    first if lifo is True), so the states themselves are never compared.
+    If bitstate_bytes is given, duplicates are detected approximately
+    (see bitstate_graph_search). A checkpoint is handled as in
+    breadth_first_graph_search: restored nodes are queued again in the
+    order they would have been popped."""
+
+    if bitstate_bytes != None:
+        return bitstate_graph_search(problem, endpoint, test_limit, bitstate_bytes, f=memoize(f, 'f'),
+                                     telemetry=telemetry)
 
     tested = 0
     expanded = 0
 
     f = memoize(f, 'f')
     node = Node(problem.initial)
-    frontier = PriorityQueue('min', f)
-    frontier.append(node)
+    frontier = PriorityQueue('min', f, tie_breaker, lifo)
     explored = set()
 
+    saved = None
+    if checkpoint != None:
+        checkpoint.bind(problem, "best_first_graph_search")
+        saved = checkpoint.restore()
+    if saved != None:
+        frontier.extend(saved["frontier"][::-1] if lifo else saved["frontier"])
+        explored = saved["explored"]
+        expanded, tested = saved["expanded"], saved["tested"]
+    else:
+        frontier.append(node)
+
     if endpoint != None:
         message = endpoint.receive()
         if message != None and "continue" in message:
@@ -330,6 +416,8 @@ def best_first_graph_search(problem, f, endpoint = None, test_limit = None):
         tested += 1
 
         if problem.goal_test(node.state):
+            if checkpoint != None:
+                checkpoint.clear()
             return node, expanded, tested
 
         explored.add(node.state)
@@ -338,70 +426,626 @@ def best_first_graph_search(problem, f, endpoint = None, test_limit = None):
                 frontier.append(child)
                 expanded += 1
             elif child in frontier:
-                if f(child) < frontier[child]:
-                    del frontier[child]
-                    frontier.append(child)
+                frontier.decrease_key(child)
 
         if endpoint != None:
             message = endpoint.receive()
             if message != None and "continue" in message:
                 run = message["continue"]
 
+        if telemetry != None and telemetry.due():
+            telemetry.publish(expanded, tested, len(frontier), len(explored), node.depth, f(node))
+
+        if checkpoint != None and checkpoint.due():
+            checkpoint.save(frontier.items(), explored, expanded, tested)
+
+    if checkpoint != None:
+        if frontier:
+            checkpoint.save(frontier.items(), explored, expanded, tested)
+        else:
+            checkpoint.clear()
     return None
 
 
 
-def depth_limited_search(problem, limit=50, endpoint=None, test_limit = None):
+def bitstate_graph_search(problem, endpoint = None, test_limit = None, bitstate_bytes = 16 * 2**20,
+                          lifo = False, f = None, n_hashes = 2, telemetry = None):
+    """Graph search with approximate duplicate detection (bitstate hashing).
+    Instead of an exact explored set and a hashed frontier, each state is
+    recorded in a Bloom filter of bitstate_bytes bytes when it is generated,
+    so a state costs a few bits whatever its size. A new state can be
+    mistaken for one already seen and pruned, so the search may miss
+    solutions or return longer ones: use it when any plan will do.
+    Nodes are expanded oldest first (testing them when generated, as in
+    breadth_first_graph_search), newest first if lifo is True, or lowest
+    f first if f is given. A found solution is returned as
+    (node, expanded, tested, info), where info holds the estimated
+    probability that a new state is pruned and the expected number of
+    states pruned by mistake."""
+
+    tested = 0
+    expanded = 0
+    breadth_first = f == None and not lifo
+
+    node = Node(problem.initial)
+    seen = BloomFilter(bitstate_bytes, n_hashes)
+    seen.add(node.state)
 
-    def recursive_dls(node, problem, limit, tested = 0, expanded = 0):
+    def solution(node):
+        return node, expanded, tested, {
+            "omission_probability": seen.false_positive_rate(),
+            "expected_omissions": seen.expected_omissions()
+        }
+
+    if breadth_first and problem.goal_test(node.state):
+        return solution(node)
+
+    counter = itertools.count()
+    if f != None:
+        frontier = [(f(node), next(counter), node)]
+    else:
+        frontier = deque([node])
+
+    if endpoint != None:
+        message = endpoint.receive()
+        if message != None and "continue" in message:
+            run = message["continue"]
+        else: run = True
+    else: run = True
+
+    while frontier and run:
 
         if test_limit != None and tested > test_limit:
-            return 'stop'
+            break
 
-        tested += 1
-        if problem.goal_test(node.state): 
-            return node, expanded, tested
-        elif limit == 0:
-            return 'cutoff'
+        if f != None:
+            node = heapq.heappop(frontier)[2]
         else:
+            node = frontier.popleft() if breadth_first else frontier.pop()
 
-            run = True
-            if endpoint != None:
-                message = endpoint.receive()
-                if message != None and "continue" in message:
-                    run = message["continue"]
+        if not breadth_first:
+            tested += 1
+            if problem.goal_test(node.state):
+                return solution(node)
 
-            if not run:
-                return "stop"
+        for child in node.expand(problem):
+            if seen.add(child.state):
+                expanded += 1
+                if breadth_first:
+                    if problem.goal_test(child.state):
+                        return solution(child)
+                    tested += 1
+                if f != None:
+                    heapq.heappush(frontier, (f(child), next(counter), child))
+                else:
+                    frontier.append(child)
 
-            cutoff_occurred = False
-            n_exp = node.expand(problem)
-            expanded += len(n_exp)
-            for child in n_exp:
-                result = recursive_dls(child, problem, limit - 1, tested, expanded)
-                if result == 'cutoff':
-                    cutoff_occurred = True
-                elif result is not None:
-                    return result
-            return 'cutoff' if cutoff_occurred else None
+        if endpoint != None:
+            message = endpoint.receive()
+            if message != None and "continue" in message:
+                run = message["continue"]
+
+        if telemetry != None and telemetry.due():
+            telemetry.publish(expanded, tested, len(frontier), len(seen), node.depth,
+                              f(node) if f != None else None)
+
+    return None
+
+
+def depth_limited_search(problem, limit=50, endpoint=None, test_limit = None,
+                         transpositions = None, counters = None, max_transpositions = 1000000,
+                         telemetry = None):
+    """Depth-first search that does not expand nodes deeper than limit.
+    Uses an explicit stack, so the limit is not bound by the recursion
+    limit. Returns (node, expanded, tested) if a goal is found, 'cutoff' if
+    some node was not expanded because of the limit, 'stop' if the search
+    was stopped or the test limit was reached, None otherwise.
+    transpositions, if given, maps each state to the largest remaining
+    depth its subtree has already been searched with: a state reached
+    again with no more remaining depth is pruned. The table can be reused
+    across calls and holds at most max_transpositions states.
+    counters, if given, is a list [expanded, tested] updated in place, so
+    that the counts (and test_limit) can span several calls."""
+
+    counters = counters if counters is not None else [0, 0]
+    cutoff_occurred = False
+
+    root = Node(problem.initial)
+    if transpositions is not None and len(transpositions) < max_transpositions:
+        transpositions[root.state] = max(limit, transpositions.get(root.state, -1))
+
+    stack = [iter([root])]
+    while stack:
+
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+            continue
+
+        if test_limit != None and counters[1] > test_limit:
+            return 'stop'
+
+        remaining = limit - node.depth
+        if transpositions is not None and node.parent is not None:
+            if transpositions.get(node.state, -1) >= remaining:
+                # sottoalbero già esplorato con profondità residua maggiore o uguale
+                cutoff_occurred = True
+                continue
+            if len(transpositions) < max_transpositions or node.state in transpositions:
+                transpositions[node.state] = remaining
+
+        counters[1] += 1
+        if problem.goal_test(node.state):
+            return node, counters[0], counters[1]
+
+        if remaining == 0:
+            cutoff_occurred = True
+            continue
 
-    # Body of depth_limited_search:
-    return recursive_dls(Node(problem.initial), problem, limit)
+        if endpoint != None:
+            message = endpoint.receive()
+            if message != None and "continue" in message and not message["continue"]:
+                return 'stop'
+
+        if telemetry != None and telemetry.due():
+            telemetry.publish(counters[0], counters[1], len(stack),
+                              len(transpositions) if transpositions is not None else None, node.depth, limit)
+
+        n_exp = node.expand(problem)
+        counters[0] += len(n_exp)
+        stack.append(iter(n_exp))
+
+    return 'cutoff' if cutoff_occurred else None
 
 
-def iterative_deepening_search(problem, endpoint = None, test_limit = None):
+def iterative_deepening_search(problem, endpoint = None, test_limit = None, max_transpositions = 1000000,
+                               telemetry = None):
+    """Depth-limited searches with increasing limits. The transposition
+    table and the counters are shared by all the iterations, so repeated
+    subtrees are pruned and test_limit applies to the whole search."""
+    transpositions = {}
+    counters = [0, 0]
     for depth in range(sys.maxsize):
-        result = depth_limited_search(problem, depth, endpoint, test_limit=test_limit)
+        result = depth_limited_search(problem, depth, endpoint, test_limit, transpositions, counters,
+                                      max_transpositions, telemetry)
         if result != 'cutoff':
             if result == 'stop':
                 return None
             return result
 
 
-def astar_search(problem, endpoint = None, h=None, test_limit = None):
+def astar_search(problem, endpoint = None, h=None, test_limit = None, tie_breaking = 'h', bitstate_bytes = None,
+                 checkpoint = None, telemetry = None):
     """A* search is best-first graph search with f(n) = g(n)+h(n).
     You need to specify the h function when you call astar_search, or
-    else in your Problem subclass."""
+    else in your Problem subclass.
+    Nodes with the same f are ordered by the tie_breaking policy:
+    'h' prefers the lowest h, then the newest node; 'lifo' prefers the
+    newest node and 'fifo' the oldest one.
+    With bitstate_bytes, duplicates are detected approximately and the
+    solution is no longer guaranteed to be optimal."""
+    if tie_breaking not in ('h', 'lifo', 'fifo'):
+        raise ValueError("tie_breaking must be one of 'h', 'lifo' or 'fifo'.")
+    h = memoize(h or problem.h, 'h')
+    return best_first_graph_search(problem, lambda n: n.path_cost + h(n), endpoint, test_limit,
+                                   tie_breaker = h if tie_breaking == 'h' else None,
+                                   lifo = tie_breaking != 'fifo', bitstate_bytes = bitstate_bytes,
+                                   checkpoint = checkpoint, telemetry = telemetry)
+
+
+def iterative_deepening_astar_search(problem, endpoint = None, h=None, test_limit = None, telemetry = None):
+    """IDA* search: a sequence of depth-first searches bounded by the
+    f-cost g(n)+h(n), where every iteration raises the bound to the lowest
+    f that exceeded it in the previous one. Memory is linear in the depth
+    of the solution. States already on the current path are skipped, and
+    the depth-first search uses an explicit stack instead of recursion."""
+    tested = 0
+    expanded = 0
+
+    h = memoize(h or problem.h, 'h')
+    f = lambda n: n.path_cost + h(n)
+
+    if endpoint != None:
+        message = endpoint.receive()
+        if message != None and "continue" in message:
+            run = message["continue"]
+        else: run = True
+    else: run = True
+
+    root = Node(problem.initial)
+    bound = f(root)
+
+    while run:
+
+        next_bound = float('inf')
+
+        tested += 1
+        if problem.goal_test(root.state):
+            return root, expanded, tested
+
+        children = sorted(root.expand(problem), key=h)
+        expanded += len(children)
+        stack = [(root, iter(children))]
+        path = {root.state}
+
+        while stack and run:
+
+            if test_limit != None and tested > test_limit:
+                return None
+
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                path.discard(node.state)
+                continue
+
+            if child.state in path:
+                continue
+
+            child_f = f(child)
+            if child_f > bound:
+                next_bound = min(next_bound, child_f)
+                continue
+
+            tested += 1
+            if problem.goal_test(child.state):
+                return child, expanded, tested
+
+            grandchildren = sorted(child.expand(problem), key=h)
+            expanded += len(grandchildren)
+            stack.append((child, iter(grandchildren)))
+            path.add(child.state)
+
+            if endpoint != None:
+                message = endpoint.receive()
+                if message != None and "continue" in message:
+                    run = message["continue"]
+
+            if telemetry != None and telemetry.due():
+                telemetry.publish(expanded, tested, len(stack), depth = child.depth, bound = bound)
+
+        if next_bound == float('inf'):
+            break
+        bound = next_bound
+
+    return None
+
+
+def bidirectional_breadth_first_search(problem, endpoint = None, test_limit = None, telemetry = None):
+    """Breadth-first search run at the same time forward from the initial
+    state and backward from the goal state, one layer at a time from the
+    side with the smaller frontier, until the two searches meet. Explores
+    about 2*b^(d/2) states instead of b^d.
+    The backward search applies the problem actions starting from the goal,
+    so the problem must have a single goal state and implement
+    inverse_action; otherwise breadth_first_graph_search is used."""
+    if problem.goal is None or isinstance(problem.goal, list):
+        return breadth_first_graph_search(problem, endpoint, test_limit, telemetry = telemetry)
+
+    tested = 1
+    expanded = 0
+
+    start = Node(problem.initial)
+    if problem.goal_test(start.state):
+        return start, expanded, tested
+
+    def join(forward_node, backward_node):
+        # segue a ritroso il ramo della ricerca all'indietro,
+        # invertendo ogni azione, fino allo stato goal
+        node = forward_node
+        while backward_node.parent is not None:
+            state = backward_node.parent.state
+            action = problem.inverse_action(state, backward_node.action)
+            node = Node(state, node, action, problem.path_cost(node.path_cost, node.state, action, state))
+            backward_node = backward_node.parent
+        return node
+
+    forward = (deque([start]), {start.state: start})
+    goal = Node(problem.goal)
+    backward = (deque([goal]), {goal.state: goal})
+
+    if endpoint != None:
+        message = endpoint.receive()
+        if message != None and "continue" in message:
+            run = message["continue"]
+        else: run = True
+    else: run = True
+
+    while forward[0] and backward[0] and run:
+
+        # espande un intero livello del lato con la frontiera più piccola
+        is_forward = len(forward[0]) <= len(backward[0])
+        (frontier, reached), (_, other_reached) = (forward, backward) if is_forward else (backward, forward)
+
+        for _ in range(len(frontier)):
+
+            if test_limit != None and tested > test_limit:
+                return None
+
+            node = frontier.popleft()
+            for child in node.expand(problem):
+                if child.state in reached:
+                    continue
+                expanded += 1
+                tested += 1
+                if child.state in other_reached:
+                    other = other_reached[child.state]
+                    if is_forward:
+                        return join(child, other), expanded, tested
+                    return join(other, child), expanded, tested
+                reached[child.state] = child
+                frontier.append(child)
+
+            if endpoint != None:
+                message = endpoint.receive()
+                if message != None and "continue" in message:
+                    run = message["continue"]
+                if not run:
+                    break
+
+            if telemetry != None and telemetry.due():
+                telemetry.publish(expanded, tested, len(forward[0]) + len(backward[0]),
+                                  len(forward[1]) + len(backward[1]), depth = node.depth)
+
+    return None
+
+
+def anytime_weighted_astar_search(problem, endpoint = None, h=None, test_limit = None,
+                                  weights = (5, 3, 2, 1.5, 1), on_solution = None, admissible = None,
+                                  telemetry = None):
+    """Anytime Repairing A* (ARA*): a sequence of weighted A* rounds with
+    f(n) = g(n) + w*h(n), one for each weight in weights (from the highest,
+    which finds a first plan quickly, down to 1). A round ends as soon as
+    no node in the frontier has f lower than the cost of the best plan found
+    so far. The next round does not start from scratch: the frontier, plus
+    the already expanded states reached by a cheaper path during the round,
+    is re-keyed with the new weight, so states are expanded again only
+    when their cost improved.
+    Nodes that cannot lead to a plan cheaper than the best one are pruned:
+    on g(n) + h(n) if the heuristic is admissible, on g(n) otherwise. If
+    admissible is None, it is read from the heuristic declared by the
+    problem (see HEURISTICS) when h is not given.
+    Each improved plan is passed to on_solution(node, expanded, tested) as
+    soon as it is found. When the search is stopped or the test limit is
+    reached, the best plan found so far is returned."""
+    tested = 0
+    expanded = 0
+    best = None
+
+    if admissible == None:
+        declared = getattr(problem, "HEURISTICS", {}).get(getattr(problem, "heuristic", None))
+        admissible = h == None and declared != None and declared[1]
     h = memoize(h or problem.h, 'h')
-    return best_first_graph_search(problem, lambda n: n.path_cost + h(n), endpoint, test_limit)
 
+    def pruned(node):
+        return best != None and node.path_cost + (h(node) if admissible else 0) >= best.path_cost
+
+    # miglior nodo trovato per ogni stato raggiunto, stati espansi nel turno corrente
+    # e stati migliorati dopo essere stati espansi nel turno corrente
+    node = Node(problem.initial)
+    reached = {node.state: node}
+    explored = set()
+    inconsistent = {}
+    open_nodes = [node]
+
+    if endpoint != None:
+        message = endpoint.receive()
+        if message != None and "continue" in message:
+            run = message["continue"]
+        else: run = True
+    else: run = True
+
+    for w in weights:
+
+        frontier = PriorityQueue('min', lambda n, w=w: n.path_cost + w * h(n), h, True)
+        frontier.extend(n for n in open_nodes if not pruned(n))
+        explored = set()
+        inconsistent = {}
+
+        while frontier and run:
+
+            if best != None and frontier[frontier.peek()] >= best.path_cost:
+                break
+
+            if test_limit != None and tested > test_limit:
+                return (best, expanded, tested) if best != None else None
+
+            node = frontier.pop()
+            tested += 1
+
+            if problem.goal_test(node.state):
+                if best == None or node.path_cost < best.path_cost:
+                    best = node
+                    if on_solution != None:
+                        on_solution(best, expanded, tested)
+                continue
+
+            explored.add(node.state)
+            for child in node.expand(problem):
+                if pruned(child):
+                    continue
+                old = reached.get(child.state)
+                if old != None and old.path_cost <= child.path_cost:
+                    continue
+                reached[child.state] = child
+                if child.state in explored:
+                    # viene espanso di nuovo solo nel turno successivo
+                    inconsistent[child.state] = child
+                else:
+                    frontier.append(child)
+                    expanded += 1
+
+            if endpoint != None:
+                message = endpoint.receive()
+                if message != None and "continue" in message:
+                    run = message["continue"]
+
+            if telemetry != None and telemetry.due():
+                telemetry.publish(expanded, tested, len(frontier), len(explored), node.depth, frontier.f(node))
+
+        if not run or not (frontier or inconsistent):
+            break
+        open_nodes = frontier.items() + list(inconsistent.values())
+
+    return (best, expanded, tested) if best != None else None
+
+
+def estimated_node_size(node):
+    """Rough number of bytes needed to keep a search node in memory: the
+    node itself, its state and the containers directly referenced by the
+    state, plus the overhead of a hash table entry."""
+    size = sys.getsizeof(node) + sys.getsizeof(node.__dict__) + sys.getsizeof(node.state)
+    try:
+        size += sum(sys.getsizeof(part) for part in node.state)
+    except TypeError:
+        pass
+    return size + 100
+
+
+def memory_bounded_astar_search(problem, endpoint = None, h=None, test_limit = None,
+                                max_nodes = None, max_bytes = 256 * 2**20, prune_fraction = 0.1,
+                                telemetry = None):
+    """A* search with a memory bound in the style of SMA*. Every node kept
+    in memory counts against the bound: the frontier, the explored set and
+    the ancestors still referenced (through parent) by any of them. At most
+    max_nodes nodes (no limit if None) and max_bytes bytes (no limit if
+    None, each node measured with estimated_node_size when it is
+    generated) are kept.
+    When the bound is exceeded, the worst leaves of the frontier (highest
+    f) are forgotten: the f of each forgotten leaf is backed up to its
+    parent, which is reopened so that the subtree can be regenerated later.
+    If that is not enough, the oldest explored states whose node is not
+    the parent of any node in memory are forgotten too. A node leaves
+    memory only when it is neither in the frontier nor explored and none
+    of its children is in memory.
+    Besides the goal node and the counters, returns a dictionary reporting
+    how many nodes were pruned and whether the plan is still guaranteed to
+    be optimal (always true if nothing was pruned), assuming h admissible."""
+    tested = 0
+    expanded = 0
+    pruned = 0
+    pruned_f = float('inf')
+
+    h = memoize(h or problem.h, 'h')
+    f = memoize(lambda n: n.path_cost + h(n), 'f')
+
+    # nodi ed occupazione stimata della memoria
+    used_nodes = 0
+    used_bytes = 0
+
+    def over_budget():
+        return ((max_nodes is not None and used_nodes > max_nodes) or
+                (max_bytes is not None and used_bytes > max_bytes))
+
+    def retain(node, place):
+        nonlocal used_nodes, used_bytes
+        node.place = place
+        node.children_in_memory = 0
+        node.size = estimated_node_size(node)
+        used_nodes += 1
+        used_bytes += node.size
+        if node.parent is not None:
+            node.parent.children_in_memory += 1
+
+    def release(node):
+        # libera il nodo e, risalendo il percorso, i padri rimasti senza figli in memoria
+        nonlocal used_nodes, used_bytes
+        while node is not None and node.place is None and node.children_in_memory == 0:
+            node.place = False
+            used_nodes -= 1
+            used_bytes -= node.size
+            node = node.parent
+            if node is not None:
+                node.children_in_memory -= 1
+
+    root = Node(problem.initial)
+    frontier = PriorityQueue('min', f, h, True)
+    retain(root, 'frontier')
+    frontier.append(root)
+    explored = {}
+
+    def prune():
+        nonlocal pruned, pruned_f
+        before = used_nodes
+        n_prune = min(len(frontier) - 1, max(1, int(len(frontier) * prune_fraction)))
+        leaves = [entry[-1] for entry in heapq.nlargest(n_prune, frontier.heap)]
+        backed_up = {}
+        for leaf in leaves:
+            del frontier[leaf]
+            leaf.place = None
+            pruned += 1
+            pruned_f = min(pruned_f, f(leaf))
+            parent = leaf.parent
+            if parent is not None:
+                previous = backed_up.get(id(parent))
+                backed_up[id(parent)] = (parent, f(leaf) if previous is None else min(previous[1], f(leaf)))
+        # riapre i padri dei nodi dimenticati con il minimo f dei figli dimenticati
+        # (prima di liberare i figli, in modo che i padri restino in memoria)
+        for parent, forgotten_f in backed_up.values():
+            # (non se lo stato del padre è in frontiera o esplorato con un altro nodo)
+            if parent not in frontier and explored.get(parent.state, parent) is parent:
+                if parent.place == 'explored':
+                    del explored[parent.state]
+                parent.place = 'frontier'
+                parent.f = max(f(parent), forgotten_f)
+                frontier.append(parent)
+        for leaf in leaves:
+            release(leaf)
+        # se non basta, dimentica gli stati esplorati meno recenti
+        # che non sono padri di nodi in memoria
+        if over_budget():
+            for state, node in list(explored.items()):
+                if not over_budget():
+                    break
+                if node.children_in_memory == 0:
+                    del explored[state]
+                    node.place = None
+                    release(node)
+        return used_nodes < before
+
+    if endpoint != None:
+        message = endpoint.receive()
+        if message != None and "continue" in message:
+            run = message["continue"]
+        else: run = True
+    else: run = True
+
+    while frontier and run:
+
+        if test_limit != None and tested > test_limit:
+            break
+
+        node = frontier.pop()
+        tested += 1
+
+        if problem.goal_test(node.state):
+            return node, expanded, tested, {"optimal": node.path_cost <= pruned_f, "pruned": pruned}
+
+        node.place = 'explored'
+        explored[node.state] = node
+        for child in node.expand(problem):
+            if child.state not in explored and child not in frontier:
+                retain(child, 'frontier')
+                frontier.append(child)
+                expanded += 1
+            elif child in frontier:
+                previous = frontier.heap[frontier.position[child]][-1]
+                if frontier.decrease_key(child):
+                    retain(child, 'frontier')
+                    previous.place = None
+                    release(previous)
+
+        while over_budget() and len(frontier) > 1:
+            if not prune():
+                break
+
+        if endpoint != None:
+            message = endpoint.receive()
+            if message != None and "continue" in message:
+                run = message["continue"]
+
+        if telemetry != None and telemetry.due():
+            telemetry.publish(expanded, tested, len(frontier), len(explored), node.depth, f(node))
+
+    return None
@@ -0,0 +1,118 @@
+"""
+Telemetria delle ricerche.
+
+Una ricerca che riceve un ``SearchTelemetry`` gli comunica periodicamente lo stato
+di avanzamento: nodi espansi e testati, dimensioni della frontiera e degli stati esplorati,
+profondità del nodo corrente o limite di f. Ogni campione viene completato con la velocità
+di espansione e la memoria occupata dal processo e passato alla funzione ``callback``.
+
+Per non rallentare la ricerca, ``due`` controlla il tempo trascorso solo una volta
+ogni ``check_every`` chiamate e la ricerca calcola i valori del campione solo
+quando ``due`` restituisce True.
+"""
+
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # modulo disponibile solo sui sistemi Unix
+    resource = None
+
+class SearchTelemetry():
+    '''
+        Raccoglie e inoltra i campioni di telemetria di una ricerca.
+
+        Parametri:
+
+            callback : function
+                Funzione chiamata con il dizionario di ogni campione
+
+            interval : float
+                Secondi minimi tra due campioni consecutivi
+
+            check_every : int
+                Numero di chiamate a ``due`` tra due controlli del tempo
+    '''
+
+    def __init__(self, callback, interval = 0.5, check_every = 128) -> None:
+        self.callback = callback
+        self.interval = interval
+        self.check_every = check_every
+        self.countdown = check_every
+        self.start = time.time()
+        self.last_time = self.start
+        self.last_expanded = 0
+
+    def due(self):
+        '''
+            Indica se è il momento di pubblicare un nuovo campione
+        '''
+        self.countdown -= 1
+        if self.countdown > 0:
+            return False
+        self.countdown = self.check_every
+        return time.time() - self.last_time >= self.interval
+
+    def publish(self, expanded, tested, frontier = None, explored = None, depth = None, bound = None):
+        '''
+            Pubblica un campione. I valori non significativi per una ricerca
+            (ad esempio gli stati esplorati di una ricerca su albero) restano None.
+
+            Parametri:
+
+                frontier : int
+                    Numero di nodi in frontiera
+
+                explored : int
+                    Numero di stati esplorati memorizzati
+
+                depth : int
+                    Profondità del nodo corrente
+
+                bound : float
+                    Limite di profondità o valore di f della ricerca
+        '''
+        now = time.time()
+        elapsed = now - self.last_time
+        sample = {
+            "time": now - self.start,
+            "expanded": expanded,
+            "tested": tested,
+            "rate": (expanded - self.last_expanded) / elapsed if elapsed > 0 else None,
+            "frontier": frontier,
+            "explored": explored,
+            "depth": depth,
+            "bound": bound,
+            "memory": resident_memory()
+        }
+        self.last_time = now
+        self.last_expanded = expanded
+        self.callback(sample)
+
+
+def resident_memory():
+    '''
+        Memoria fisica (in byte) occupata dal processo.
+        Restituisce None se il sistema non la rende disponibile (è letta da ``/proc``).
+    '''
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def peak_memory(children = False):
+    '''
+        Memoria fisica massima (in byte) occupata dal processo dal suo avvio oppure,
+        con ``children = True``, dal più grande dei processi figli terminati.
+        Restituisce None se il sistema non la rende disponibile (è letta con ``getrusage``).
+    '''
+    if resource == None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # macOS riporta il valore in byte, gli altri sistemi in kilobyte
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
@@ -9,6 +9,8 @@ import collections
 import collections.abc
 import functools
 import heapq
+import itertools
+import math
 import operator
 import os.path
 import random
@@ -720,7 +722,7 @@ class hashabledict(dict):
 # ______________________________________________________________________________
 # Queues: Stack, FIFOQueue, PriorityQueue
 # Stack and FIFOQueue are implemented as list and collection.deque
-# PriorityQueue is implemented here
+# PriorityQueue, FIFOFrontier and LIFOFrontier are implemented here
 
 
 class PriorityQueue:
@@ -728,10 +730,21 @@ class PriorityQueue:
     order) is returned first.
     If order is 'min', the item with minimum f(x) is
     returned first; if order is 'max', then it is the item with maximum f(x).
-    Also supports dict-like lookup."""
-
-    def __init__(self, order='min', f=lambda x: x):
+    Also supports dict-like lookup.
+    Ties on f are broken by tie_breaker(x) (lower first) if given, then by
+    insertion order: oldest first, or newest first if lifo is True. Items
+    themselves are never compared.
+    The queue is an indexed binary heap: a map from each item to its position
+    in the heap gives O(1) membership tests and lookups, and O(log n) deletion
+    and decrease-key. Items equal to each other share the same position, so an
+    item equal to one already in the queue replaces it."""
+
+    def __init__(self, order='min', f=lambda x: x, tie_breaker=None, lifo=False):
         self.heap = []
+        self.position = {}
+        self.tie_breaker = tie_breaker
+        self.counter = itertools.count()
+        self.lifo = lifo
         if order == 'min':
             self.f = f
         elif order == 'max':  # now item with max f(x)
@@ -741,7 +754,10 @@ class PriorityQueue:
 
     def append(self, item):
         """Insert item at its correct position."""
-        heapq.heappush(self.heap, (self.f(item), item))
+        if item in self.position:
+            del self[item]
+        self.heap.append(self._entry(self.f(item), item))
+        self._sift_up(len(self.heap) - 1)
 
     def extend(self, items):
         """Insert each item in items at its correct position."""
@@ -752,33 +768,222 @@ class PriorityQueue:
         """Pop and return the item (with min or max f(x) value)
         depending on the order."""
         if self.heap:
-            return heapq.heappop(self.heap)[1]
+            return self._remove(0)[-1]
         else:
             raise Exception('Trying to pop from empty PriorityQueue.')
 
+    def peek(self):
+        """Return the item that pop would return, without removing it."""
+        if self.heap:
+            return self.heap[0][-1]
+        else:
+            raise Exception('Trying to peek into empty PriorityQueue.')
+
+    def decrease_key(self, item):
+        """Replace the item equal to item with item itself if f(item) is
+        better than its current value. Return True if the item was replaced."""
+        i = self.position[item]
+        value = self.f(item)
+        if value < self.heap[i][0]:
+            self.heap[i] = self._entry(value, item)
+            self._sift_up(i)
+            return True
+        return False
+
+    def items(self):
+        """Return the items in the order they would be popped."""
+        return [entry[-1] for entry in sorted(self.heap, key=lambda entry: entry[:-1])]
+
     def __len__(self):
         """Return current capacity of PriorityQueue."""
         return len(self.heap)
 
     def __contains__(self, key):
         """Return True if the key is in PriorityQueue."""
-        return any([item == key for _, item in self.heap])
+        return key in self.position
 
     def __getitem__(self, key):
-        """Returns the first value associated with key in PriorityQueue.
+        """Returns the value associated with key in PriorityQueue.
         Raises KeyError if key is not present."""
-        for value, item in self.heap:
-            if item == key:
-                return value
-        raise KeyError(str(key) + " is not in the priority queue")
+        try:
+            return self.heap[self.position[key]][0]
+        except KeyError:
+            raise KeyError(str(key) + " is not in the priority queue")
 
     def __delitem__(self, key):
-        """Delete the first occurrence of key."""
+        """Delete the occurrence of key."""
         try:
-            del self.heap[[item == key for _, item in self.heap].index(True)]
-        except ValueError:
+            i = self.position[key]
+        except KeyError:
             raise KeyError(str(key) + " is not in the priority queue")
-        heapq.heapify(self.heap)
+        self._remove(i)
+
+    def _entry(self, value, item):
+        tie = self.tie_breaker(item) if self.tie_breaker else 0
+        order = next(self.counter)
+        return (value, tie, -order if self.lifo else order, item)
+
+    def _remove(self, i):
+        heap = self.heap
+        entry = heap[i]
+        del self.position[entry[-1]]
+        last = heap.pop()
+        if i < len(heap):
+            heap[i] = last
+            self.position[last[-1]] = i
+            self._sift_up(i)
+            self._sift_down(self.position[last[-1]])
+        return entry
+
+    def _sift_up(self, i):
+        heap, position = self.heap, self.position
+        entry = heap[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if not entry < heap[parent]:
+                break
+            heap[i] = heap[parent]
+            position[heap[i][-1]] = i
+            i = parent
+        heap[i] = entry
+        position[entry[-1]] = i
+
+    def _sift_down(self, i):
+        heap, position = self.heap, self.position
+        n = len(heap)
+        entry = heap[i]
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and heap[child + 1] < heap[child]:
+                child += 1
+            if not heap[child] < entry:
+                break
+            heap[i] = heap[child]
+            position[heap[i][-1]] = i
+            i = child
+        heap[i] = entry
+        position[entry[-1]] = i
+
+
+class HashedFrontier:
+    """A queue of items paired with a hash index of its contents, so that
+    membership tests take O(1) time instead of a linear scan. Items equal
+    to each other (e.g. search nodes with the same state) are counted, so
+    the index stays correct even if the same item is appended twice.
+    Subclasses define the order in which items are popped."""
+
+    def __init__(self, items=()):
+        self.queue = collections.deque()
+        self.index = {}
+        self.extend(items)
+
+    def append(self, item):
+        """Insert item in the queue."""
+        self.queue.append(item)
+        self.index[item] = self.index.get(item, 0) + 1
+
+    def extend(self, items):
+        """Insert each item in items."""
+        for item in items:
+            self.append(item)
+
+    def pop(self):
+        raise NotImplementedError
+
+    def _unindex(self, item):
+        n = self.index[item]
+        if n > 1:
+            self.index[item] = n - 1
+        else:
+            del self.index[item]
+        return item
+
+    def __len__(self):
+        return len(self.queue)
+
+    def __contains__(self, item):
+        return item in self.index
+
+    def __iter__(self):
+        return iter(self.queue)
+
+
+class FIFOFrontier(HashedFrontier):
+    """A First-In-First-Out queue with O(1) membership tests."""
+
+    def pop(self):
+        """Remove and return the oldest item."""
+        return self._unindex(self.queue.popleft())
+
+
+class LIFOFrontier(HashedFrontier):
+    """A Last-In-First-Out stack with O(1) membership tests."""
+
+    def pop(self):
+        """Remove and return the newest item."""
+        return self._unindex(self.queue.pop())
+
+
+class BloomFilter:
+    """A fixed-size bit array recording the hashes of the items added to it
+    (bitstate hashing when n_hashes is 1). Each item sets n_hashes bits, so
+    memory does not grow with the number of items; in exchange a membership
+    test can report an item that was never added (a false positive), never
+    the opposite. Items must have a well-mixed hash, like encoded states."""
+
+    def __init__(self, n_bytes, n_hashes=2):
+        self.n_bits = max(1, n_bytes) * 8
+        self.bits = bytearray(max(1, n_bytes))
+        self.n_hashes = n_hashes
+        self.count = 0
+
+    def add(self, item):
+        """Record item. Return True if it was (as far as the filter can tell) new."""
+        # double hashing: the two halves of the hash generate all the positions
+        h = hash(item) & 0xFFFFFFFFFFFFFFFF
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        bits, n_bits = self.bits, self.n_bits
+        new = False
+        for i in range(self.n_hashes):
+            p = (h1 + i * h2) % n_bits
+            byte, mask = bits[p >> 3], 1 << (p & 7)
+            if not byte & mask:
+                bits[p >> 3] = byte | mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, item):
+        h = hash(item) & 0xFFFFFFFFFFFFFFFF
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        for i in range(self.n_hashes):
+            p = (h1 + i * h2) % self.n_bits
+            if not self.bits[p >> 3] & (1 << (p & 7)):
+                return False
+        return True
+
+    def __len__(self):
+        """Number of items recorded as new."""
+        return self.count
+
+    def false_positive_rate(self):
+        """Estimated probability that an item never added is reported as
+        present, given the items recorded so far."""
+        return self._rate(self.count)
+
+    def expected_omissions(self, steps=1000):
+        """Estimated number of new items wrongly reported as present while
+        the items recorded so far were being added."""
+        if self.count == 0:
+            return 0.0
+        step = self.count / steps
+        return step * sum(self._rate(i * step) for i in range(steps))
+
+    def _rate(self, count):
+        return (1 - math.exp(-self.n_hashes * count / self.n_bits)) ** self.n_hashes
 
 
 # ______________________________________________________________________________
@@ -1,4 +1,5 @@
 import queue
+import threading
 
 class Channel:
     def __init__(self) -> None:
@@ -33,3 +34,39 @@ class Endpoint:
 
     def outputSize(self):
         return self.output_queue.qsize()
+
+class SearchSignal:
+    '''
+        Segnale di arresto e pausa di una ricerca, utilizzabile al posto di un ``Endpoint``.
+
+        ``receive`` legge solo due attributi booleani, senza accedere a code o lock,
+        per cui può essere chiamato ad ogni iterazione della ricerca: l'arresto viene
+        rilevato entro una iterazione. In pausa ``receive`` blocca la ricerca
+        finché non viene chiamato ``resume`` oppure ``stop``.
+    '''
+
+    STOP = {"continue" : False}
+
+    def __init__(self) -> None:
+        self.stopped = False
+        self.paused = False
+        self.resumed = threading.Event()
+
+    def stop(self):
+        self.stopped = True
+        self.resumed.set()
+
+    def pause(self):
+        self.resumed.clear()
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+        self.resumed.set()
+
+    def receive(self, block=True):
+        if self.paused:
+            self.resumed.wait()
+        if self.stopped:
+            return SearchSignal.STOP
+        return None